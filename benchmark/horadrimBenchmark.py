@@ -0,0 +1,335 @@
+import os
+import os.path
+import sys
+import time
+import json
+import random
+import socket
+import argparse
+import platform
+import tempfile
+import shutil
+import subprocess
+from array import array
+
+DEFAULT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'horadrimSoftware.py')
+TYPE_NAME = 'bench'
+PHASES = ['create type', 'create record', 'mixed', 'filter', 'list record', 'delete type']
+PHASE_FILES = {phase: str(i + 1) + '-' + phase.replace(' ', '-') + '.txt' for i, phase in enumerate(PHASES)}
+
+# The workload is a single type "bench" with the fields id, value and name, id being the primary
+# key. The n keys of the type are numbered 0 to n-1 and inserted in an order set by the key
+# distribution. Only integers and a fixed random seed go into the command files, so the same
+# arguments always generate the same files on every machine and every version of the program.
+
+class KeyOrder(object):
+    """Maps positions 0 to n-1 onto the keys 0 to n-1.
+    "sequential" keeps the order, "uniform" and "zipfian" spread the keys with the permutation
+    i * step + offset mod n, step being coprime to n, so even 10M keys need no table.
+    """
+    def __init__(self, n, distribution, rng):
+        self.n = n
+        self.step, self.offset = 1, 0
+        if distribution != 'sequential' and n > 1:
+            self.step = rng.randrange(n // 3 + 1, n) | 1
+            while gcd(self.step, n) != 1:
+                self.step += 2
+            self.offset = rng.randrange(n)
+
+    def key(self, position):
+        return (position * self.step + self.offset) % self.n
+
+def gcd(a, b):
+    while b:
+        a, b = b, a % b
+    return a
+
+class KeyChooser(object):
+    """Picks the keys that the searches and updates of the mixed phase target, among the keys at
+    the first n positions of the KeyOrder. "sequential" walks through the positions in order,
+    "uniform" picks any position with the same chance and "zipfian" picks position k-1 with a
+    chance proportional to 1/k^s. Zipfian ranks are drawn from the inverse of the continuous Zipf
+    distribution. Positions are turned into keys by the KeyOrder so that the hot keys are not all
+    neighbours in the index.
+    """
+    def __init__(self, keyOrder, n, distribution, rng, skew):
+        self.keyOrder = keyOrder
+        self.n = max(1, n)
+        self.distribution = distribution
+        self.rng = rng
+        self.skew = skew
+        self.position = 0
+
+    def next(self):
+        n = self.n
+        if self.distribution == 'sequential':
+            self.position = (self.position + 1) % n
+            return self.keyOrder.key(self.position)
+        elif self.distribution == 'uniform':
+            return self.keyOrder.key(self.rng.randrange(n))
+        u = self.rng.random()
+        if abs(self.skew - 1.0) < 1e-9:
+            rank = n ** u
+        else:
+            rank = ((n ** (1 - self.skew) - 1) * u + 1) ** (1 / (1 - self.skew))
+        return self.keyOrder.key(min(n, int(rank)) - 1)
+
+def formatKey(key, keyType):
+    #Fixed width string keys sort in the same order as the integers they stand for.
+    return str(key) if keyType == 'int' else 'k%09d' % key
+
+def recordFields(key, keyType, version):
+    return formatKey(key, keyType) + ' ' + str(key * 7 + version) + ' n' + str(key % 1000)
+
+def writeCommands(fileName, commands):
+    commandNo = 0
+    with open(fileName, 'w') as file:
+        for command in commands:
+            file.write(command + '\n')
+            commandNo += 1
+    return commandNo
+
+def generate(directory, records, operations, filters, distribution, keyType, mix, skew, filterWidth, seed):
+    """Writes the command file of every phase into a directory. Returns the number of commands
+    in each phase."""
+    rng = random.Random(seed)
+    keyOrder = KeyOrder(records, distribution, rng)
+    kinds = [kind for kind, weight in mix for i in range(weight)]
+    mixedKinds = [rng.choice(kinds) for i in range(operations)]
+    #Deletes remove the keys at the last positions of the key order, the coldest ones of a zipfian
+    #skew, and searches and updates never target them, so every lookup finds its record.
+    deletes = mixedKinds.count('delete')
+    chooser = KeyChooser(keyOrder, records - deletes, distribution, rng, skew)
+    counts = {}
+
+    def createType():
+        yield 'create type ' + TYPE_NAME + ' 3 1 id ' + keyType + ' value int name str'
+
+    def createRecords():
+        for position in range(records):
+            yield 'create record ' + TYPE_NAME + ' ' + recordFields(keyOrder.key(position), keyType, 0)
+
+    def mixed():
+        deleted = 0
+        for i, kind in enumerate(mixedKinds):
+            if kind == 'search':
+                yield 'search record ' + TYPE_NAME + ' ' + formatKey(chooser.next(), keyType)
+            elif kind == 'update':
+                key = chooser.next()
+                yield 'update record ' + TYPE_NAME + ' ' + formatKey(key, keyType) + ' ' + recordFields(key, keyType, i + 1)
+            elif kind == 'delete':
+                deleted += 1
+                yield 'delete record ' + TYPE_NAME + ' ' + formatKey(keyOrder.key(records - deleted), keyType)
+            else:
+                #New records get keys above the loaded ones so that they never collide.
+                yield 'create record ' + TYPE_NAME + ' ' + recordFields(records + i, keyType, 0)
+
+    def rangeFilters():
+        width = max(1, min(filterWidth, records))
+        for i in range(filters):
+            low = rng.randrange(records - width + 1)
+            yield ('filter record ' + TYPE_NAME + ' ' + formatKey(low, keyType) + '<=id<' +
+                   formatKey(low + width, keyType))
+
+    def listRecords():
+        yield 'list record ' + TYPE_NAME
+
+    def deleteType():
+        yield 'delete type ' + TYPE_NAME
+
+    generators = [createType, createRecords, mixed, rangeFilters, listRecords, deleteType]
+    for phase, commands in zip(PHASES, generators):
+        counts[phase] = writeCommands(os.path.join(directory, PHASE_FILES[phase]), commands())
+    return counts
+
+def percentile(sortedValues, fraction):
+    """Returns the nearest-rank percentile of a sorted sequence."""
+    if not sortedValues:
+        return None
+    rank = max(1, int(-(-fraction * len(sortedValues) // 1)))
+    return sortedValues[rank - 1]
+
+def phaseReport(commandNo, seconds, latencies, failures):
+    report = {'commands': commandNo, 'seconds': round(seconds, 6),
+              'commandsPerSecond': round(commandNo / seconds, 2) if seconds else None,
+              'meanMs': round(seconds * 1000 / commandNo, 4) if commandNo else None,
+              'p50Ms': None, 'p99Ms': None, 'failures': failures}
+    if latencies is not None:
+        latencies = sorted(latencies)
+        report['p50Ms'] = round(percentile(latencies, 0.50) * 1000, 4) if latencies else None
+        report['p99Ms'] = round(percentile(latencies, 0.99) * 1000, 4) if latencies else None
+    return report
+
+def countFailures(logFileName, since):
+    """Counts the failed commands logged after the first since lines of horadrimLog.csv."""
+    with open(logFileName) as logFile:
+        return sum(1 for i, line in enumerate(logFile) if i >= since and line.rstrip().endswith(',failure'))
+
+def countLines(fileName):
+    if not os.path.exists(fileName):
+        return 0
+    with open(fileName) as file:
+        return sum(1 for line in file)
+
+def runCli(script, workDirectory, commandFile, extraArgs):
+    """Runs a command file with one invocation of the program, the way it is used from the
+    command line. Only the time of the whole run is known, so there are no percentiles."""
+    outputFile = os.path.join(workDirectory, 'output.txt')
+    logFileName = os.path.join(workDirectory, 'horadrimLog.csv')
+    logged = countLines(logFileName)
+    start = time.perf_counter()
+    subprocess.run([sys.executable, script, commandFile, outputFile] + extraArgs, cwd=workDirectory, check=True)
+    seconds = time.perf_counter() - start
+    return seconds, None, countFailures(logFileName, logged)
+
+class ServerRunner(object):
+    """Runs the commands through the server mode of the program, timing every command from the
+    moment it is sent until its response has been read."""
+    def __init__(self, script, workDirectory, extraArgs):
+        self.socketPath = os.path.join(workDirectory, 'horadrim.sock')
+        self.process = subprocess.Popen([sys.executable, script, 'serve', self.socketPath] + extraArgs,
+                                        cwd=workDirectory)
+        deadline = time.time() + 60
+        while not os.path.exists(self.socketPath):
+            if self.process.poll() is not None or time.time() > deadline:
+                raise RuntimeError('the server did not start')
+            time.sleep(0.01)
+        self.connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.connection.connect(self.socketPath)
+        self.responses = self.connection.makefile('rb')
+
+    def run(self, commandFile):
+        latencies = array('d')
+        failures = 0
+        start = time.perf_counter()
+        with open(commandFile, 'rb') as commands:
+            for command in commands:
+                sent = time.perf_counter()
+                self.connection.sendall(command)
+                #The output lines of a command end with an empty line and its success or failure.
+                for result in iter(self.responses.readline, b'\n'):
+                    if not result:
+                        raise RuntimeError('the server closed the connection')
+                if self.responses.readline() != b'success\n':
+                    failures += 1
+                latencies.append(time.perf_counter() - sent)
+        return time.perf_counter() - start, latencies, failures
+
+    def close(self):
+        self.connection.close()
+        self.process.terminate()
+        self.process.wait()
+
+def runBenchmark(args):
+    mix = parseMix(args.mix)
+    workDirectory = tempfile.mkdtemp(prefix='horadrimBenchmark')
+    script = os.path.abspath(args.script)
+    extraArgs = args.horadrim_args.split() if args.horadrim_args else []
+    try:
+        commandDirectory = os.path.join(workDirectory, 'commands')
+        os.mkdir(commandDirectory)
+        counts = generate(commandDirectory, args.records, args.operations, args.filters, args.distribution,
+                          args.key_type, mix, args.zipf_skew, args.filter_width, args.seed)
+        databaseDirectory = os.path.join(workDirectory, 'database')
+        os.mkdir(databaseDirectory)
+
+        server = ServerRunner(script, databaseDirectory, extraArgs) if args.runner == 'server' else None
+        phases = {}
+        try:
+            for phase in PHASES:
+                commandFile = os.path.join(commandDirectory, PHASE_FILES[phase])
+                if server != None:
+                    seconds, latencies, failures = server.run(commandFile)
+                else:
+                    seconds, latencies, failures = runCli(script, databaseDirectory, commandFile, extraArgs)
+                phases[phase] = phaseReport(counts[phase], seconds, latencies, failures)
+        finally:
+            if server != None:
+                server.close()
+    finally:
+        shutil.rmtree(workDirectory, ignore_errors=True)
+
+    return {
+        'program': script,
+        'version': programVersion(script),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {'records': args.records, 'operations': args.operations, 'filters': args.filters,
+                   'filterWidth': args.filter_width, 'distribution': args.distribution,
+                   'keyType': args.key_type, 'mix': args.mix, 'zipfSkew': args.zipf_skew,
+                   'seed': args.seed, 'runner': args.runner, 'horadrimArgs': extraArgs},
+        'phases': phases,
+    }
+
+def programVersion(script):
+    """Returns the commit of the program, so that results of different versions can be told apart."""
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=os.path.dirname(script),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def parseMix(mix):
+    """Parses a command mix such as "search=70,update=20,delete=5,create=5" into weights."""
+    weights = []
+    for part in mix.split(','):
+        kind, weight = part.split('=')
+        if kind not in ('search', 'update', 'delete', 'create'):
+            raise argparse.ArgumentTypeError('unknown command in the mix: ' + kind)
+        weights.append((kind, int(weight)))
+    return weights
+
+def addWorkloadArguments(parser):
+    parser.add_argument('--records', type=int, default=1000,
+                        help='records created before the mixed phase, 1000 to 10000000 (default: %(default)s)')
+    parser.add_argument('--operations', type=int, default=None,
+                        help='commands in the mixed phase (default: the number of records)')
+    parser.add_argument('--filters', type=int, default=100,
+                        help='range filter commands (default: %(default)s)')
+    parser.add_argument('--filter-width', type=int, default=100,
+                        help='keys covered by every range filter (default: %(default)s)')
+    parser.add_argument('--distribution', choices=['sequential', 'uniform', 'zipfian'], default='uniform',
+                        help='order of the inserted keys and keys targeted by the mixed phase (default: %(default)s)')
+    parser.add_argument('--key-type', choices=['int', 'str'], default='int',
+                        help='type of the primary key (default: %(default)s)')
+    parser.add_argument('--mix', default='search=70,update=20,delete=5,create=5',
+                        help='weights of the commands of the mixed phase (default: %(default)s)')
+    parser.add_argument('--zipf-skew', type=float, default=0.99,
+                        help='exponent of the zipfian distribution (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=321,
+                        help='seed of the generator, the same seed gives the same files (default: %(default)s)')
+
+parser = argparse.ArgumentParser(description='Generates reproducible workloads for horadrimSoftware.py '
+                                             'and measures how fast it runs them.')
+commands = parser.add_subparsers(dest='command', required=True)
+generateParser = commands.add_parser('generate', help='write the command file of every phase into a directory')
+generateParser.add_argument('directory')
+addWorkloadArguments(generateParser)
+runParser = commands.add_parser('run', help='run the workload in a temporary directory and report the results as JSON')
+addWorkloadArguments(runParser)
+runParser.add_argument('--runner', choices=['server', 'cli'], default='server',
+                       help='send every command to the server and time it, or run every phase as one '
+                            'invocation of the program, which works with versions without a server (default: %(default)s)')
+runParser.add_argument('--script', default=DEFAULT_SCRIPT,
+                       help='the program to measure (default: this checkout)')
+runParser.add_argument('--horadrim-args', default='',
+                       help='options passed on to the program, for example "--storage-format binary"')
+runParser.add_argument('--output', help='file the JSON report is written to (default: the standard output)')
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    if args.operations == None:
+        args.operations = args.records
+
+    if args.command == 'generate':
+        os.makedirs(args.directory, exist_ok=True)
+        counts = generate(args.directory, args.records, args.operations, args.filters, args.distribution,
+                          args.key_type, parseMix(args.mix), args.zipf_skew, args.filter_width, args.seed)
+        print(json.dumps(counts, indent=2))
+    else:
+        report = json.dumps(runBenchmark(args), indent=2)
+        if args.output:
+            with open(args.output, 'w') as output:
+                output.write(report + '\n')
+        else:
+            print(report)
@@ -1,831 +1,3037 @@
-import os
-import os.path
-import time
-import sys
-
-# Important note: This B+ tree structure defined by the Node class and BPlusTree class are taken from the internet.
-# Here is a link to the original github repo of the mentioned structure from the owner of this code segment.
-# https://gist.github.com/savarin/69acd246302567395f65ad6b97ee503d 
-class Node(object):
-    """Base node object.
-    Each node stores keys and values. Keys are not unique to each value, and as such values are
-    stored as a list under each key.
-    Attributes:
-        order (int): The maximum number of keys each node can hold.
-    """
-    def __init__(self, order):
-        """Child nodes can be converted into parent nodes by setting self.leaf = False. Parent nodes
-        simply act as a medium to traverse the tree."""
-        self.order = order
-        self.keys = []
-        self.values = []
-        self.leaf = True
-
-    def add(self, key, value):
-        """Adds a key-value pair to the node."""
-        # If the node is empty, simply insert the key-value pair.
-        if not self.keys:
-            self.keys.append(key)
-            self.values.append([value])
-            return None
-
-        for i, item in enumerate(self.keys):
-            # If new key matches existing key, add to list of values.
-            if key == item:
-                self.values[i].append(value)
-                break
-
-            # If new key is smaller than existing key, insert new key to the left of existing key.
-            elif key < item:
-                self.keys = self.keys[:i] + [key] + self.keys[i:]
-                self.values = self.values[:i] + [[value]] + self.values[i:]
-                break
-
-            # If new key is larger than all existing keys, insert new key to the right of all
-            # existing keys.
-            elif i + 1 == len(self.keys):
-                self.keys.append(key)
-                self.values.append([value])
-
-    def split(self):
-        """Splits the node into two and stores them as child nodes."""
-        left = Node(self.order)
-        right = Node(self.order)
-        mid = self.order // 2
-
-        left.keys = self.keys[:mid]
-        left.values = self.values[:mid]
-
-        right.keys = self.keys[mid:]
-        right.values = self.values[mid:]
-
-        # When the node is split, set the parent key to the left-most key of the right child node.
-        self.keys = [right.keys[0]]
-        self.values = [left, right]
-        self.leaf = False
-
-    def is_full(self):
-        """Returns True if the node is full."""
-        return len(self.keys) == self.order
-
-    def show(self, counter=0):
-        """Prints the keys at each level."""
-
-        # Recursively print the key of child nodes (if these exist).
-        if not self.leaf:
-            for item in self.values:
-                item.show(counter + 1)
-
-class BPlusTree(object):
-    """B+ tree object, consisting of nodes.
-    Nodes will automatically be split into two once it is full. When a split occurs, a key will
-    'float' upwards and be inserted into the parent node to act as a pivot.
-    Attributes:
-        order (int): The maximum number of keys each node can hold.
-    """
-    def __init__(self, order=8):
-        self.root = Node(order)
-        self.keyList = []
-
-    def _find(self, node, key):
-        """ For a given node and key, returns the index where the key should be inserted and the
-        list of values at that index."""
-        for i, item in enumerate(node.keys):
-            if key < item:
-                return node.values[i], i
-
-        return node.values[i + 1], i + 1
-
-    def _merge(self, parent, child, index):
-        """For a parent and child node, extract a pivot from the child to be inserted into the keys
-        of the parent. Insert the values from the child into the values of the parent.
-        """
-        parent.values.pop(index)
-        pivot = child.keys[0]
-
-        for i, item in enumerate(parent.keys):
-            if pivot < item:
-                parent.keys = parent.keys[:i] + [pivot] + parent.keys[i:]
-                parent.values = parent.values[:i] + child.values + parent.values[i:]
-                break
-
-            elif i + 1 == len(parent.keys):
-                parent.keys += [pivot]
-                parent.values += child.values
-                break
-
-    def insert(self, key, value, type = ""):
-        """Inserts a key-value pair after traversing to a leaf node. If the leaf node is full, split
-        the leaf node into two.
-        """
-        parent = None
-        child = self.root
-
-        # Traverse tree until leaf node is reached.
-        while not child.leaf:
-            parent = child
-            child, index = self._find(child, key)
-
-        child.add(key, value)
-        self.keyList.append(key)
-        
-        if type == "str" or type == "":
-            self.keyList.sort()
-        elif type == "int":
-            self.keyList.sort(key = int)
-
-        # If the leaf node is full, split the leaf node into two.
-        if child.is_full():
-            child.split()
-
-            # Once a leaf node is split, it consists of a internal node and two leaf nodes. These
-            # need to be re-inserted back into the tree.
-            if parent and not parent.is_full():
-                self._merge(parent, child, index)
-
-    def retrieve(self, key):
-        """Returns a value for a given key, and None if the key does not exist."""
-        child = self.root
-
-        while not child.leaf:
-            child, index = self._find(child, key)
-
-        for i, item in enumerate(child.keys):
-            if key == item:
-                return child.values[i]
-
-        return None
-
-    def show(self):
-        """Prints the keys at each level."""
-        self.root.show()
-
-    def returnMatchingKeys(self,condition,type=""):
-        
-        valueToCheck= "",""
-        
-        if "=" in condition:
-            valueToCheck = condition.split("=")[1]
-            data = self.retrieve(valueToCheck)
-            if data == None:
-                return []
-            else:
-                return [valueToCheck]
-
-        elif "<" in condition:
-            valueToCheck = condition.split("<")[1]
-            matchingKeys = []
-            for key in self.keyList:
-                if type == "str" or type == "":
-                    if key < valueToCheck:
-                        matchingKeys.append(key)
-                else:
-                    if int(key) < int(valueToCheck):
-                        matchingKeys.append(key)
-            return matchingKeys
-        
-        elif ">" in condition:
-            valueToCheck = condition.split(">")[1]
-            matchingKeys = []
-            for key in self.keyList[::-1]:
-                if type == "str" or type == "":
-                    if key > valueToCheck:
-                        matchingKeys.append(key)
-                else:
-                    if int(key) > int(valueToCheck):
-                        matchingKeys.append(key)
-            return matchingKeys[::-1]
-
-PAGES_PER_FILE = 3
-RECORDS_PER_PAGE = 10
-PAGE_SIZE = 2410 + 90 #(12*20+1)*10 + (89 + 1)
-
-outFile = open(sys.argv[2],'w')
-logFile = open('horadrimLog.csv', 'a')
-inputFile = open(sys.argv[1])
-
-dir_list = os.listdir(os.getcwd())
-
-types_list = []
-for l in dir_list:
-    if 'types' in l:
-        types_list.append(l)
-
-records_list = []
-for r in dir_list:
-    if 'records' in r:
-        records_list.append(r)
-
-
-def log(line, succession):
-    logFile.write(str(int(time.time())) + ',' + line + ',' + succession + '\n')
-
-def whichOperation(tokens):
-    if tokens[0] == 'create':
-        if tokens[1] == 'type':
-            return 1
-        elif tokens[1] == 'record':
-            return 4
-
-    elif tokens[0] == 'delete':
-        if tokens[1] == 'type':
-            return 2
-        elif tokens[1] == 'record':
-            return 5
-
-    elif tokens[0] == 'list':
-        if tokens[1] == 'type':
-            return 3
-        elif tokens[1] == 'record':
-            return 8
-    
-    elif tokens[0] == 'update':
-        return 6
-
-    elif tokens[0] == 'search':
-        return 7
-
-    elif tokens[0] == 'filter':
-        return 9
-
-def deleteRecord(data):
-    file,pageNo,record = data.split(":")[0],int(data.split(":")[1]),int(data.split(":")[2])
-
-    deleteFromFile = open(file,'r+')
-
-    for i in range(pageNo):
-        page = deleteFromFile.read(PAGE_SIZE)
-    header = page.split("\n")[0]
-    recordNo = header.split(",")[2].split(":")[1]
-    newRecordNo = str(int(recordNo) - 1)
-
-    emptySpots = header.split(",")[1].split(":")[1].split("-")
-    if emptySpots == [""]:
-        emptySpots = []
-    emptySpots.append(str(record))
-    emptySpots.sort(key=int)
-    newEmptySpots = "-".join(emptySpots)
-
-    newHeader = ("PAGE:"+str(pageNo)+",Empty:" + newEmptySpots +",Records:"+newRecordNo).ljust(89," ") + "\n"
-    lineToAdd = " ".ljust(240," ")+"\n"
-
-    deleteFromFile.seek((pageNo-1)*(PAGE_SIZE+11))
-    deleteFromFile.write(newHeader)
-    deleteFromFile.seek((pageNo-1)*(PAGE_SIZE+11) + (91) + (record-1)*242)
-    deleteFromFile.write(lineToAdd)
-    deleteFromFile.flush()   
-    deleteFromFile.close()
-
-    removeFileIfEmpty(file)               
-
-def searchTypes(typeName):
-    for file in types_list:
-        findPlace = open(file,'r')
-        for i in range(PAGES_PER_FILE):
-            page = findPlace.read(PAGE_SIZE)
-            if page != "":            
-                recordsInPage = page.split("\n")
-                pageNo = recordsInPage[0].split(",")[0].split(":")[1]
-                for record in recordsInPage:
-                    if record:
-                        if typeName == record.split(" ")[1]:
-                            recordNo = record.split(" ")[0]
-                            primaryKeyOrder = record.split(" ")[2]
-                            return [pageNo,recordNo,primaryKeyOrder,record,file]
-    return -1
-
-def findTypeFile():
-    for file in types_list:
-        findFile = open(file,'r')
-        for i in range(PAGES_PER_FILE):
-            findFile.seek(i*(PAGE_SIZE+11))
-            header = findFile.readline()
-            recordNo = header.split(",")[2].split(":")[1]
-            if int(recordNo) < 10:
-                return file
-
-    return createNewFile('type')
-
-def findRecordFile():
-    for file in records_list:
-        findFile = open(file,'r')
-        for i in range(PAGES_PER_FILE):
-            findFile.seek(i*(PAGE_SIZE+11))
-            header = findFile.readline()
-            recordNo = header.split(",")[2].split(":")[1]
-            if int(recordNo) < 10:
-                return file
-
-    return createNewFile('record')
-
-def createNewFile(method):
-    filename = ''
-
-    if method == 'type':
-        filename = 'types' + str(len(types_list)+1) + '.txt'
-        for i in range(len(types_list)):
-            filenamecheck = 'types'+str(i+1)+'.txt'
-            if filenamecheck not in types_list:
-                filename = filenamecheck
-
-        types_list.append(filename)
-
-    elif method == 'record':
-        filename = 'records' + str(len(records_list)+1) + '.txt'
-        for i in range(len(records_list)):
-            filenamecheck = 'records'+str(i+1)+'.txt'
-            if filenamecheck not in records_list:
-                filename = filenamecheck
-
-        records_list.append(filename)
-
-    file = open(filename, 'a')
-    fileContent = ""
-    for i in range(PAGES_PER_FILE):
-        pageHeader = ("PAGE:"+str(i+1) +",Empty:1-2-3-4-5-6-7-8-9-10,Records:0").ljust(89," ") + "\n"
-        fileContent = fileContent + pageHeader
-        for j in range(10):
-            fileContent = fileContent + " ".ljust(240," ") + "\n"
-    file.write(fileContent)
-    file.flush()
-    file.close()
-
-    return filename
-
-def removeFileIfEmpty(filename):
-    file = open(filename, 'r')
-    for i in range(PAGES_PER_FILE):
-        file.seek(i*(PAGE_SIZE+11))
-        header = file.readline()
-        recordNo = header.split(",")[2].split(":")[1]
-        if int(recordNo) != 0:
-            return 'file is not empty'
-    if 'types' in filename:
-        types_list.remove(filename)
-    elif 'records' in filename: 
-        records_list.remove(filename)
-    file.close()
-    os.remove(filename)
-    
-for line in inputFile:
-    line = line.strip()
-    if not line:
-        continue
-
-    tokens = line.split()
-    type = whichOperation(tokens) 
-
-    if type ==1 :
-        if len(types_list) == 0:
-            typeFile = open('types1.txt', 'a')
-            types_list.append('types1.txt')
-            fileContent = ""
-            for i in range(PAGES_PER_FILE):
-                pageHeader = ("PAGE:"+str(i+1) +",Empty:1-2-3-4-5-6-7-8-9-10,Records:0").ljust(89," ") + "\n"
-                fileContent = fileContent + pageHeader
-                for j in range(10):
-                    fileContent = fileContent + " ".ljust(240," ") + "\n"
-            typeFile.write(fileContent)
-            typeFile.flush()
-            typeFile.close()
-
-        typeName = tokens[2]
-
-        searchResult = searchTypes(typeName)
-
-        if  searchResult != -1:
-            log(line, 'failure')
-            continue
-
-        if not os.path.exists('B+'+typeName+'.txt'):
-            bTreeFile = open('B+'+typeName+'.txt','a')
-            bTreeFile.close()
-
-        fieldNo = int(tokens[3])
-        primaryKeyOrder = tokens[4]
-        primaryKey = tokens[4 + 2*int(tokens[4])-1]
-        primaryKeyType = tokens[4 + 2*int(tokens[4])]
-
-        #Note in typeInf primary key is the first field.
-        typeInf = typeName + " " + primaryKeyOrder + " " +primaryKey + " " + primaryKeyType
-        for i in range(fieldNo):
-            if tokens[5+2*i] != primaryKey:
-                typeInf = typeInf +" " + tokens[5+2*i] + " " +tokens[6+2*i]
-        
-
-        #Find a place to insert new type info
-        availableTypeFile = findTypeFile()
-        findPlace = open(availableTypeFile,'r+')
-
-        for i in range(PAGES_PER_FILE):
-            page = findPlace.read(PAGE_SIZE)
-            header = page.split("\n")[0]
-            pageNo = header.split(",")[0].split(":")[1]
-            recordNo = header.split(",")[2].split(":")[1]
-            if recordNo.strip() == "10":
-                continue
-            
-            emptySpots = header.split(",")[1].split(":")[1].split("-")
-            firstEmptySpot = emptySpots[0]
-            emptySpots.remove(firstEmptySpot)
-            newEmptySpots = "-".join(emptySpots)
-            newRecordNo = str(int(recordNo) + 1)
-            newHeader = ("PAGE:" +str(i+1)+",Empty:" + newEmptySpots +",Records:"+newRecordNo).ljust(89," ") +"\n"
-            lineToAdd = (firstEmptySpot +" " + typeInf).ljust(240," ") + "\n"
-
-            findPlace.seek(i*(PAGE_SIZE+11))
-            findPlace.write(newHeader)
-            findPlace.seek(i*(PAGE_SIZE+11) + (91) + (int(firstEmptySpot)-1)*242)
-            findPlace.write(lineToAdd)
-            findPlace.flush()
-            findPlace.close()
-            
-            break
-
-    elif type == 2:
-        typeToDelete = tokens[2]
-
-        results = searchTypes(typeToDelete)
-
-        if  results == -1:
-            log(line, 'failure')
-            continue
-
-        else: 
-            pageNo, recordIndex, fileName = results[0], results[1], results[4]
-            findPlace = open(fileName,'r+')
-
-
-            findPlace.seek((int(pageNo)-1)*(PAGE_SIZE+11))
-            header = findPlace.readline()
-            recordNo = header.split(",")[2].split(":")[1]
-            newRecordNo = str(int(recordNo) - 1)
-
-            #file silme durumunu ayarla
-            emptySpots = header.split(",")[1].split(":")[1].split("-")
-            
-            if emptySpots == [""]:
-                emptySpots = []
-            emptySpots.append(recordIndex)
-            emptySpots.sort(key=int)
-            newEmptySpots = "-".join(emptySpots)
-
-            newHeader = ("PAGE:"+ pageNo+",Empty:" + newEmptySpots +",Records:"+newRecordNo).ljust(89," ") + "\n"
-            lineToAdd = " ".ljust(240," ")+"\n"
-
-            findPlace.seek((int(pageNo)-1)*(PAGE_SIZE+11))
-            findPlace.write(newHeader)
-            findPlace.seek((int(pageNo)-1)*(PAGE_SIZE+11) + (91) + (int(recordIndex)-1)*242)
-            findPlace.write(lineToAdd)
-            findPlace.flush()
-            findPlace.close()   
-
-            ###CHECK IF THE TYPE FILE ALL EMPTIED
-            removeFileIfEmpty(fileName)
-                          
-        #ALL RECORDS OF THIS TYPE SHOULD BE DELETED
-        bplustree = BPlusTree(order=4)
-
-        # primaryKeyOrder = results[2]
-        # primaryKey = tokens[2+int(primaryKeyOrder)]
-
-        if os.path.exists("B+"+typeToDelete+".txt"):
-
-            readLines = open("B+"+typeToDelete+".txt",'r')
-            while True:
-                tree_line = readLines.readline()
-                if not tree_line:
-                    break
-                bplustree.insert(tree_line.split("-")[0],tree_line.split("-")[1])
-            readLines.close()
-        else:
-            log(line, 'failure')
-            continue
-
-        keys = bplustree.keyList
-        for key in keys:
-            data = data = bplustree.retrieve(key)[0][:-1]
-            deleteRecord(data)
-        os.remove("B+"+typeToDelete+".txt")
-                
-    elif type == 3:
-        results = []
-        for file in types_list:
-            findPlace = open(file,'r')
-            for i in range(PAGES_PER_FILE):
-                page = findPlace.read(PAGE_SIZE)
-                if page != "":            
-                    recordsInPage = page.split("\n")
-                    for record in recordsInPage:
-                        if record.strip() != "":
-                            if record.split(" ")[1]:
-                                results.append(record.split(" ")[1])
-
-        if len(results) == 0: 
-            log(line, 'failure')
-            continue
-
-        results.sort()
-        for type in results:
-            outFile.write(type)
-            outFile.write("\n")
-            outFile.flush()
-
-        findPlace.close()
-
-    elif type == 4:
-        if len(records_list) == 0:
-            recordFile = open('records1.txt', 'a')
-            records_list.append('records1.txt')
-            fileContent = ""
-            for i in range(PAGES_PER_FILE):
-                pageHeader = ("PAGE:"+str(i+1) +",Empty:1-2-3-4-5-6-7-8-9-10,Records:0").ljust(89," ") + "\n"
-                fileContent = fileContent + pageHeader
-                for j in range(10):
-                    fileContent = fileContent + " ".ljust(240," ") + "\n"
-            recordFile.write(fileContent)
-            recordFile.flush()
-            recordFile.close()
-
-        typeName = tokens[2]
-
-        if searchTypes(typeName) == -1:
-            log(line, 'failure')
-            continue
-
-        primaryKeyOrder = searchTypes(typeName)[2]
-        primaryKey = tokens[2+int(primaryKeyOrder)] 
-
-        bplustree = BPlusTree(order=4)
-        
-        if os.path.exists("B+"+typeName+".txt"):
-            readLines = open("B+"+typeName+".txt",'r')
-            while True:
-                tree_line = readLines.readline()
-                if not tree_line:
-                    break
-                bplustree.insert(tree_line.split("-")[0],tree_line.split("-")[1])
-            readLines.close()
-
-            if bplustree.retrieve(primaryKey) != None:
-                log(line, 'failure')
-                continue
-
-        else:
-            log(line, 'failure')
-            continue
-
-        recordInfo = typeName
-        for token in tokens[3:]:
-            recordInfo = recordInfo + " " + token
-        
-        #Find a place to insert new record info
-        availableRecordFile = findRecordFile()
-        findPlace = open(availableRecordFile,'r+')
-
-        for i in range(PAGES_PER_FILE):
-            page = findPlace.read(PAGE_SIZE)
-            header = page.split("\n")[0]
-            pageNo = header.split(",")[0].split(":")[1]
-            recordNo = header.split(",")[2].split(":")[1]
-            
-            if recordNo.strip() == "10":
-                continue
-
-            emptySpots = header.split(",")[1].split(":")[1].split("-")
-            firstEmptySpot = emptySpots[0]
-            emptySpots.remove(firstEmptySpot)
-            newEmptySpots = "-".join(emptySpots)
-            newRecordNo = str(int(recordNo) + 1)
-            newHeader = ("PAGE:" +str(i+1)+",Empty:" + newEmptySpots +",Records:"+newRecordNo).ljust(89," ") + "\n"
-            lineToAdd = (firstEmptySpot +" " + recordInfo).ljust(240," ") + "\n"
-
-            findPlace.seek(i*(PAGE_SIZE+11))
-            findPlace.write(newHeader)
-            findPlace.seek(i*(PAGE_SIZE+11) + (91) + (int(firstEmptySpot)-1)*242)
-            findPlace.write(lineToAdd)
-            findPlace.flush()
-            findPlace.close()
-
-            bTreeUpdate = open("B+"+typeName+".txt",'a')
-            bTreeUpdate.write(primaryKey+"-"+availableRecordFile+':'+str(i+1)+":"+firstEmptySpot+"\n")
-            bTreeUpdate.close()
-            break
-
-    elif type == 5:
-
-        typeName = tokens[2]
-        bplustree = BPlusTree(order=4)
-        primaryKey = tokens[3]
-
-        if os.path.exists("B+"+typeName+".txt"):
-            newBTreeIfKeyExists = ""
-            readLines = open("B+"+typeName+".txt",'r')
-            while True:
-                tree_line = readLines.readline()
-
-                if tree_line.split("-")[0] != primaryKey:
-                    newBTreeIfKeyExists = newBTreeIfKeyExists + tree_line
-
-                if not tree_line:
-                    break
-                bplustree.insert(tree_line.split("-")[0],tree_line.split("-")[1])
-            readLines.close()
-
-            if bplustree.retrieve(primaryKey) == None:
-                log(line, 'failure')
-                continue
-            #new b+ file with record removed
-            else:
-                writeLines = open("B+"+typeName+".txt",'w')
-                writeLines.write(newBTreeIfKeyExists)
-                writeLines.close()
-            
-        else:
-            log(line, 'failure')
-            continue
-        
-        data = bplustree.retrieve(primaryKey)[0][:-1]
-        deleteRecord(data)
-    
-    elif type == 6:
-        typeName = tokens[2]
-        bplustree = BPlusTree(order=4)
-        primaryKey = tokens[3]
-
-        if os.path.exists("B+"+typeName+".txt"):
-            readLines = open("B+"+typeName+".txt",'r')
-            while True:
-                tree_line = readLines.readline()
-
-                if not tree_line:
-                    break
-                bplustree.insert(tree_line.split("-")[0],tree_line.split("-")[1])
-            readLines.close()
-
-            if bplustree.retrieve(primaryKey) == None:
-                log(line, 'failure')
-                continue
-        else:
-            log(line, 'failure')
-            continue
-
-        data = bplustree.retrieve(primaryKey)[0][:-1]
-        file,pageNo,record = data.split(":")[0],data.split(":")[1],data.split(":")[2]
-
-        #Bu primary key hep birinci mi yoksa type a bağlı mı öğren.
-
-        updatedInfo = typeName
-        for token in tokens[4:]:
-            updatedInfo = updatedInfo + " " + token
-
-        updateFile = open(file,'r+')
-
-        lineToAdd =(record + " " +updatedInfo).ljust(240," ") +"\n"
-        updateFile.seek((int(pageNo)-1)*(PAGE_SIZE+11) + (91) + (int(record)-1)*242)
-        updateFile.write(lineToAdd)
-        updateFile.flush()
-        updateFile.close()  
-       
-    elif type == 7:
-       
-        typeName = tokens[2]
-        bplustree = BPlusTree(order=4)
-        primaryKey = tokens[3]
-
-        if os.path.exists("B+"+typeName+".txt"):
-            readLines = open("B+"+typeName+".txt",'r')
-            
-            while True:
-                tree_line = readLines.readline()
-                if not tree_line:
-                    break
-                bplustree.insert(tree_line.split("-")[0],tree_line.split("-")[1])
-            readLines.close()
-
-            if bplustree.retrieve(primaryKey) == None:
-                log(line, 'failure')
-                continue
-        else:
-            log(line, 'failure')
-            continue
-
-        data = bplustree.retrieve(primaryKey)[0][:-1]
-        file,pageNo,record = data.split(":")[0],data.split(":")[1],data.split(":")[2]
-
-        findPlace = open(file,'r+')
-
-        findPlace.seek((int(pageNo)-1)*(PAGE_SIZE+11) + (91) + (int(record)-1)*242)
-        searchedRecord= findPlace.readline().strip()
-
-        findPlace.close()
-
-        searchedRecord = " ".join(searchedRecord.split(" ")[2:])
-        outFile.write(searchedRecord)
-        outFile.write("\n")
-        outFile.flush()
-    
-    elif type == 8:
-        typeName = tokens[2]
-        bplustree = BPlusTree(order=4)
-
-        if os.path.exists("B+"+typeName+".txt"):
-            readLines = open("B+"+typeName+".txt",'r')
-            while True:
-                tree_line = readLines.readline()
-                if not tree_line:
-                    break
-                bplustree.insert(tree_line.split("-")[0],tree_line.split("-")[1])  
-            readLines.close()
-
-        else:
-            log(line, 'failure')
-            continue
-
-        if searchTypes(typeName) == -1:
-            log(line, 'failure')
-            continue
-
-        typeInformation = searchTypes(typeName)[3].split(" ")
-        primaryKeyType = typeInformation[4]
-        primaryKeyOrder = int(typeInformation[2])
-        keys = bplustree.keyList
-        results = []
-
-        for key in keys:
-            data = bplustree.retrieve(key)[0][:-1]
-            file,pageNo,record = data.split(":")[0],data.split(":")[1],data.split(":")[2]
-
-            findPlace = open(file,'r+')
-            findPlace.seek((int(pageNo)-1)*(PAGE_SIZE+11) + (91) + (int(record)-1)*242)
-            searchedRecord = findPlace.readline().strip()
-            searchedRecord = " ".join(searchedRecord.split(" ")[2:])
-            
-            result = searchedRecord
-            results.append(result)
-            findPlace.close()
-        
-        if len(results)==0:
-            log(line, 'failure')
-            continue
-
-        if primaryKeyType == "str":
-            results.sort(key=lambda x:x[primaryKeyOrder-1])
-        else:
-            results.sort(key=lambda x: int(x[primaryKeyOrder-1]) )
-        
-        for result in results:
-            outFile.write(result)
-            outFile.write("\n")
-            outFile.flush()
-    
-    elif type == 9:
-
-        typeName = tokens[2]
-        bplustree = BPlusTree(order=4)
-        condition = tokens[3]
-
-        if not os.path.exists("B+"+typeName+".txt"):
-            log(line, 'failure')
-            continue
-            
-        typeInformation = searchTypes(typeName)[3]
-        fieldType = typeInformation.split(" ")[4]
-
-        readLines = open("B+"+typeName+".txt",'r')
-        while True:
-            tree_line = readLines.readline()
-            if not tree_line:
-                break
-            bplustree.insert(tree_line.split("-")[0],tree_line.split("-")[1],fieldType) 
-        readLines.close()
-        
-
-        keys = bplustree.returnMatchingKeys(condition,fieldType)
-        results = []
-
-        for key in keys:
-
-            data = bplustree.retrieve(key)[0][:-1]
-            file,pageNo,record = data.split(":")[0],data.split(":")[1],data.split(":")[2]
-
-            findPlace = open(file,'r+')
-            findPlace.seek((int(pageNo)-1)*(PAGE_SIZE+11) + (91) + (int(record)-1)*242)
-            filteredRecord = findPlace.readline().strip()
-            filteredRecord = filteredRecord.split(" ")[2:]
-            results.append(filteredRecord)
-            findPlace.close()
-
-        if len(results) == 0:
-            log(line, 'failure')
-            continue
-
-        for result in results:
-            outFile.write(" ".join(result))
-            outFile.write("\n")
-            outFile.flush()
-
-    log(line, 'success')
-
-outFile.close()
+import os
+import os.path
+import time
+import sys
+import struct
+import argparse
+import atexit
+import mmap
+import json
+import csv
+import re
+import multiprocessing
+import zlib
+import cProfile
+import asyncio
+import signal
+import socket
+from collections import OrderedDict
+from bisect import bisect_left, bisect_right
+
+class IOCounters(object):
+    """Running totals of the work done on the data and index files, see CommandStats.
+    Attributes:
+        fileOpens (int): Files opened.
+        pagesRead (int), pagesWritten (int): Type, record and index pages read from or written
+            to their files, pages parsed from a memory mapping count as read.
+        bytesRead (int), bytesWritten (int): Bytes of those pages and of the file headers.
+        nodesVisited (int): B+ tree nodes looked at, whether they were in memory or not.
+        cacheHits (int), cacheMisses (int): Pages and nodes found or not found in the buffer
+            pool or the index cache.
+    """
+    NAMES = ('fileOpens', 'pagesRead', 'pagesWritten', 'bytesRead', 'bytesWritten', 'nodesVisited',
+             'cacheHits', 'cacheMisses')
+
+    def __init__(self):
+        for name in self.NAMES:
+            setattr(self, name, 0)
+
+    def read(self, size, pages=1):
+        self.pagesRead += pages
+        self.bytesRead += size
+
+    def written(self, size, pages=1):
+        self.pagesWritten += pages
+        self.bytesWritten += size
+
+    def snapshot(self):
+        return [getattr(self, name) for name in self.NAMES]
+
+    def since(self, snapshot):
+        return [now - before for now, before in zip(self.snapshot(), snapshot)]
+
+    def add(self, counts):
+        """Adds the counts of work done elsewhere, such as in a worker process."""
+        for name, count in zip(self.NAMES, counts):
+            setattr(self, name, getattr(self, name) + count)
+
+class FileHandlePool(object):
+    """Files opened for binary reading and writing, kept open between accesses.
+    At most maxOpen files are open at once, the least recently used one is closed when another
+    file has to be opened. When mapped is set the files can also be read through read only memory
+    mappings. Writes are then not buffered, so that they are seen by the mappings right away.
+    Attributes:
+        maxOpen (int): The maximum number of open files.
+        mapped (bool): Whether pages are read through memory mappings instead of read calls.
+        counters (IOCounters): Where the I/O done through the files of the pool is counted.
+    """
+    def __init__(self, maxOpen, mapped=False, counters=None):
+        self.maxOpen = max(1, maxOpen)
+        self.mapped = mapped
+        self.counters = counters if counters is not None else IOCounters()
+        self.handles = OrderedDict()
+        self.maps = {}
+
+    def get(self, fileName):
+        handle = self.handles.get(fileName)
+        if handle is None:
+            if len(self.handles) >= self.maxOpen:
+                self.close(next(iter(self.handles)))
+            handle = open(fileName, 'r+b', buffering=0 if self.mapped else -1)
+            self.counters.fileOpens += 1
+            self.handles[fileName] = handle
+        else:
+            self.handles.move_to_end(fileName)
+        return handle
+
+    def map(self, fileName, size):
+        """Returns a memory mapping of a file covering at least its first size bytes. Views of
+        the mapping must be released before the file is used again through the pool."""
+        handle = self.get(fileName)
+        mapping = self.maps.get(fileName)
+        if mapping is None or len(mapping) < size:
+            if mapping is not None:
+                mapping.close()
+            mapping = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            self.maps[fileName] = mapping
+        return mapping
+
+    def close(self, fileName):
+        """Closes a file if it is open, this must be done before the file is removed."""
+        mapping = self.maps.pop(fileName, None)
+        if mapping is not None:
+            mapping.close()
+        handle = self.handles.pop(fileName, None)
+        if handle is not None:
+            handle.close()
+
+    def flush(self):
+        """Hands everything written through the open files to the system, so that other open
+        files of them see it."""
+        for handle in self.handles.values():
+            handle.flush()
+
+    def sync(self):
+        """Makes sure everything written through the open files is on disk."""
+        self.flush()
+        for handle in self.handles.values():
+            os.fsync(handle.fileno())
+
+    def closeAll(self):
+        for fileName in list(self.handles):
+            self.close(fileName)
+
+    def detach(self):
+        """Forgets the open files without closing them, so that a forked process opens files of
+        its own instead of sharing the file offsets of its parent."""
+        self.handles = OrderedDict()
+        self.maps = {}
+
+# The index of every type is kept in its own paged file "B+<typeName>.idx". Page 0 is a header
+# holding the root pointer, every other page is exactly one node of the tree. Nodes are only
+# read when a lookup walks through them, so a point lookup touches O(log n) pages.
+INDEX_PAGE_SIZE = 4096
+INDEX_MAGIC = b'HBPT'
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct('<4sHBIIQ')   # magic, version, key type, root page, page count, key count
+INDEX_NODE_HEADER = struct.Struct('<BHI')  # leaf flag, key count, next leaf page (0 if none)
+INDEX_INT_KEY = struct.Struct('<q')
+INDEX_CHILD = struct.Struct('<I')
+INDEX_MAX_KEY = 255                        # str keys and locators are stored after a one byte length
+HASH_MAGIC = b'HHSH'
+HASH_VERSION = 1
+HASH_HEADER = struct.Struct('<4sHBBIQI')  # magic, version, key type, global depth, page count, key count, directory page count
+HASH_BUCKET_HEADER = struct.Struct('<BH')  # local depth, key count
+HASH_DIRECTORY_ENTRIES = INDEX_PAGE_SIZE // INDEX_CHILD.size
+HASH_MAX_DIRECTORY_PAGES = (INDEX_PAGE_SIZE - HASH_HEADER.size) // INDEX_CHILD.size
+
+class PagedIndex(object):
+    """The page handling shared by the index files, a PagedBPlusTree or a HashIndex. Pages are
+    decoded into nodes when they are first read and kept in nodes, modified ones are marked in
+    dirty until they are written back by flush() or when the IndexCache evicts them. Every page
+    read or written is counted in the counters of the file handles, and the write-ahead log is
+    forced before a page is written. Subclasses give _encodePage() and _decode() for their pages
+    and flush() for their header.
+    Attributes:
+        fileName (str): The index file.
+        keyType (str): "int" or "str", the type of the keys of the index.
+        cache (IndexCache): The cache limiting how many nodes stay in memory, or None.
+        handles (FileHandlePool): Where the index file is opened, the one of the cache if given.
+    """
+    @classmethod
+    def create(cls, fileName, keyType, cache=None):
+        """Creates an index file holding no keys and returns it opened."""
+        return cls.bulk_load(fileName, keyType, [], cache)
+
+    def close(self):
+        self.flush()
+        self.handles.close(self.fileName)
+        if self.cache:
+            self.cache.forget(self)
+        self.nodes = {}
+
+    def discard(self):
+        """Closes the index without writing back what was modified, before its file is replaced
+        or removed."""
+        self.dirty.clear()
+        self.headerDirty = False
+        self.close()
+
+    def toKey(self, key):
+        """Converts a key token to the value it is stored and ordered as. Raises ValueError for
+        non-numeric tokens of an int index."""
+        if self.keyType == 'int':
+            return int(key)
+        return key
+
+    def _read(self, pageNo):
+        node = self.nodes.get(pageNo)
+        counters = self.handles.counters
+        counters.nodesVisited += 1
+        if node is None:
+            counters.cacheMisses += 1
+            counters.read(INDEX_PAGE_SIZE)
+        else:
+            counters.cacheHits += 1
+        if node is None and self.handles.mapped:
+            mapping = self.handles.map(self.fileName, (pageNo + 1) * INDEX_PAGE_SIZE)
+            with memoryview(mapping) as data:
+                node = self._decode(pageNo, data[pageNo * INDEX_PAGE_SIZE:(pageNo + 1) * INDEX_PAGE_SIZE])
+            self.nodes[pageNo] = node
+        elif node is None:
+            indexFile = self.handles.get(self.fileName)
+            indexFile.seek(pageNo * INDEX_PAGE_SIZE)
+            node = self._decode(pageNo, indexFile.read(INDEX_PAGE_SIZE))
+            self.nodes[pageNo] = node
+        if self.cache:
+            self.cache.touch(self, pageNo)
+        return node
+
+    def _write(self, node):
+        """Marks a node as modified, it reaches the disk on the next flush or eviction."""
+        self.nodes[node.pageNo] = node
+        self.dirty.add(node.pageNo)
+        if self.cache:
+            self.cache.touch(self, node.pageNo, True)
+
+    def _writePage(self, node):
+        if self.cache and self.cache.wal:
+            self.cache.wal.force()
+        indexFile = self.handles.get(self.fileName)
+        indexFile.seek(node.pageNo * INDEX_PAGE_SIZE)
+        indexFile.write(self._encodePage(node).ljust(INDEX_PAGE_SIZE, b'\0'))
+        self.handles.counters.written(INDEX_PAGE_SIZE)
+
+    def _evict(self, pageNo):
+        if pageNo in self.dirty:
+            self._writePage(self.nodes[pageNo])
+            self.dirty.discard(pageNo)
+        del self.nodes[pageNo]
+
+class PagedNode(object):
+    """A single node of a PagedBPlusTree, stored in one page of the index file.
+    Leaf nodes hold sorted keys and one locator string per key and are chained to their right
+    sibling through next. Internal nodes hold sorted separator keys and the page numbers of
+    their len(keys) + 1 children.
+    """
+    def __init__(self, pageNo, leaf=True):
+        self.pageNo = pageNo
+        self.leaf = leaf
+        self.keys = []
+        self.values = []
+        self.next = 0
+
+class PagedBPlusTree(PagedIndex):
+    """B+ tree stored page by page in a file.
+    Nodes are split once their encoded size no longer fits in INDEX_PAGE_SIZE. Modified nodes
+    stay in memory marked as dirty and are written back to their own page in place by flush(),
+    or earlier when an IndexCache evicts them. Keys are unique, inserting an existing key
+    replaces its locator. Deleted keys are removed from their leaf without rebalancing.
+    Attributes:
+        keyType (str): "int" or "str", the type of the primary key the tree is built on.
+        cache (IndexCache): The cache limiting how many nodes stay in memory, or None.
+        handles (FileHandlePool): Where the index file is opened, the one of the cache if given.
+    """
+    def __init__(self, fileName, cache=None):
+        self.fileName = fileName
+        self.cache = cache
+        self.handles = cache.handles if cache else FileHandlePool(1)
+        indexFile = self.handles.get(fileName)
+        indexFile.seek(0)
+        magic, version, keyType, self.root, self.pageCount, self.keyCount = INDEX_HEADER.unpack(
+            indexFile.read(INDEX_HEADER.size))
+        self.handles.counters.read(INDEX_HEADER.size, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(fileName + ' is not a B+ tree index file')
+        self.keyType = 'int' if keyType == 1 else 'str'
+        self.nodes = {}
+        self.dirty = set()
+        self.headerDirty = False
+
+    @classmethod
+    def bulk_load(cls, fileName, keyType, sorted_pairs, cache=None):
+        """Creates an index file from (key, locator) pairs given in strictly ascending key order
+        and returns it opened. Leaves are packed full and written left to right, then every level
+        of internal nodes is built from the first keys of the level below it, so the whole tree
+        is written in a single sequential pass.
+        """
+        if cache:
+            cache.handles.close(fileName)
+        newFile = open(fileName, 'wb')
+        newFile.write(b'\0' * INDEX_PAGE_SIZE)
+        pageCount = 1
+
+        def keySize(key):
+            return INDEX_INT_KEY.size if keyType == 'int' else 1 + len(key.encode())
+
+        # Each leaf is held back until the next one is started so that its next pointer is known.
+        level = []
+        leaf = PagedNode(1)
+        size = INDEX_NODE_HEADER.size
+        keyCount = 0
+        for key, value in sorted_pairs:
+            if keyType == 'int':
+                key = int(key)
+            if leaf.keys and key <= leaf.keys[-1]:
+                raise ValueError('bulk_load needs strictly ascending keys')
+            entrySize = keySize(key) + 1 + len(value.encode())
+            if leaf.keys and size + entrySize > INDEX_PAGE_SIZE:
+                leaf.next = leaf.pageNo + 1
+                newFile.write(cls._encode(leaf, keyType).ljust(INDEX_PAGE_SIZE, b'\0'))
+                level.append((leaf.keys[0], leaf.pageNo))
+                leaf = PagedNode(leaf.pageNo + 1)
+                size = INDEX_NODE_HEADER.size
+            leaf.keys.append(key)
+            leaf.values.append(value)
+            size += entrySize
+            keyCount += 1
+        newFile.write(cls._encode(leaf, keyType).ljust(INDEX_PAGE_SIZE, b'\0'))
+        level.append((leaf.keys[0] if leaf.keys else None, leaf.pageNo))
+        pageCount = leaf.pageNo + 1
+
+        while len(level) > 1:
+            upperLevel = []
+            node = None
+            for firstKey, pageNo in level:
+                if node is not None and size + keySize(firstKey) + INDEX_CHILD.size <= INDEX_PAGE_SIZE:
+                    node.keys.append(firstKey)
+                    node.values.append(pageNo)
+                    size += keySize(firstKey) + INDEX_CHILD.size
+                    continue
+                if node is not None:
+                    newFile.write(cls._encode(node, keyType).ljust(INDEX_PAGE_SIZE, b'\0'))
+                node = PagedNode(pageCount, False)
+                node.values.append(pageNo)
+                size = INDEX_NODE_HEADER.size + INDEX_CHILD.size
+                upperLevel.append((firstKey, pageCount))
+                pageCount += 1
+            newFile.write(cls._encode(node, keyType).ljust(INDEX_PAGE_SIZE, b'\0'))
+            level = upperLevel
+
+        newFile.seek(0)
+        newFile.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, 1 if keyType == 'int' else 0,
+                                        level[0][1], pageCount, keyCount))
+        newFile.flush()
+        os.fsync(newFile.fileno())
+        newFile.close()
+        if cache:
+            cache.handles.counters.written(pageCount * INDEX_PAGE_SIZE, pageCount)
+        return cls(fileName, cache)
+
+    def flush(self):
+        """Writes every dirty node and the header back to the index file."""
+        for pageNo in sorted(self.dirty):
+            self._writePage(self.nodes[pageNo])
+        self.dirty.clear()
+        if self.headerDirty:
+            if self.cache and self.cache.wal:
+                self.cache.wal.force()
+            indexFile = self.handles.get(self.fileName)
+            indexFile.seek(0)
+            indexFile.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, 1 if self.keyType == 'int' else 0,
+                                              self.root, self.pageCount, self.keyCount))
+            self.handles.counters.written(INDEX_HEADER.size, 0)
+            self.headerDirty = False
+
+    @staticmethod
+    def _encode(node, keyType):
+        data = [INDEX_NODE_HEADER.pack(1 if node.leaf else 0, len(node.keys), node.next)]
+        for key in node.keys:
+            if keyType == 'int':
+                data.append(INDEX_INT_KEY.pack(key))
+            else:
+                encoded = key.encode()
+                data.append(bytes([len(encoded)]) + encoded)
+        for value in node.values:
+            if node.leaf:
+                encoded = value.encode()
+                data.append(bytes([len(encoded)]) + encoded)
+            else:
+                data.append(INDEX_CHILD.pack(value))
+        return b''.join(data)
+
+    def _decode(self, pageNo, data):
+        leaf, keyNo, nextLeaf = INDEX_NODE_HEADER.unpack_from(data)
+        node = PagedNode(pageNo, leaf == 1)
+        node.next = nextLeaf
+        offset = INDEX_NODE_HEADER.size
+        for i in range(keyNo):
+            if self.keyType == 'int':
+                node.keys.append(INDEX_INT_KEY.unpack_from(data, offset)[0])
+                offset += INDEX_INT_KEY.size
+            else:
+                length = data[offset]
+                node.keys.append(str(data[offset + 1:offset + 1 + length], 'utf-8'))
+                offset += 1 + length
+        if node.leaf:
+            for i in range(keyNo):
+                length = data[offset]
+                node.values.append(str(data[offset + 1:offset + 1 + length], 'utf-8'))
+                offset += 1 + length
+        else:
+            for i in range(keyNo + 1):
+                node.values.append(INDEX_CHILD.unpack_from(data, offset)[0])
+                offset += INDEX_CHILD.size
+        return node
+
+    def _encodePage(self, node):
+        return self._encode(node, self.keyType)
+
+    def _newNode(self, leaf):
+        node = PagedNode(self.pageCount, leaf)
+        self.pageCount += 1
+        self.headerDirty = True
+        self._write(node)
+        return node
+
+    def _findLeaf(self, key):
+        """Walks from the root to the leaf that should hold key and returns the path of
+        (internal node, child index) pairs together with the leaf."""
+        path = []
+        node = self._read(self.root)
+        while not node.leaf:
+            index = bisect_right(node.keys, key)
+            path.append((node, index))
+            node = self._read(node.values[index])
+        return path, node
+
+    def _fits(self, node):
+        return len(self._encodePage(node)) <= INDEX_PAGE_SIZE
+
+    def retrieve(self, key):
+        """Returns the locator stored for a given key, and None if the key does not exist."""
+        try:
+            key = self.toKey(key)
+        except ValueError:
+            return None
+        path, leaf = self._findLeaf(key)
+        index = bisect_left(leaf.keys, key)
+        if index < len(leaf.keys) and leaf.keys[index] == key:
+            return leaf.values[index]
+        return None
+
+    def insert(self, key, value):
+        """Inserts a key-locator pair into its leaf and splits full nodes on the way back up."""
+        key = self.toKey(key)
+        if self.cache and self.cache.wal:
+            self.cache.wal.log("insert", self.fileName, key, value)
+        path, node = self._findLeaf(key)
+        index = bisect_left(node.keys, key)
+        if index < len(node.keys) and node.keys[index] == key:
+            node.values[index] = value
+        else:
+            node.keys.insert(index, key)
+            node.values.insert(index, value)
+            self.keyCount += 1
+
+        while not self._fits(node):
+            right = self._newNode(node.leaf)
+            mid = len(node.keys) // 2
+            if node.leaf:
+                # The right half keeps its first key, which is copied up as the separator.
+                pivot = node.keys[mid]
+                right.keys, node.keys = node.keys[mid:], node.keys[:mid]
+                right.values, node.values = node.values[mid:], node.values[:mid]
+                right.next, node.next = node.next, right.pageNo
+            else:
+                # The middle key of an internal node moves up and is not kept in either half.
+                pivot = node.keys[mid]
+                right.keys, node.keys = node.keys[mid + 1:], node.keys[:mid]
+                right.values, node.values = node.values[mid + 1:], node.values[:mid + 1]
+            self._write(right)
+            self._write(node)
+
+            if path:
+                parent, index = path.pop()
+                parent.keys.insert(index, pivot)
+                parent.values.insert(index + 1, right.pageNo)
+                node = parent
+            else:
+                newRoot = self._newNode(False)
+                newRoot.keys = [pivot]
+                newRoot.values = [node.pageNo, right.pageNo]
+                self.root = newRoot.pageNo
+                node = newRoot
+
+        self._write(node)
+        self.headerDirty = True
+
+    def delete(self, key):
+        """Removes a key from its leaf. Returns the locator it pointed to, or None."""
+        try:
+            key = self.toKey(key)
+        except ValueError:
+            return None
+        path, leaf = self._findLeaf(key)
+        index = bisect_left(leaf.keys, key)
+        if index == len(leaf.keys) or leaf.keys[index] != key:
+            return None
+        if self.cache and self.cache.wal:
+            self.cache.wal.log("delete", self.fileName, key)
+        leaf.keys.pop(index)
+        value = leaf.values.pop(index)
+        self.keyCount -= 1
+        self._write(leaf)
+        self.headerDirty = True
+        return value
+
+    def items(self):
+        """Yields every (key, locator) pair in ascending key order by walking the leaf chain."""
+        return self.range()
+
+    def range(self, lo=None, hi=None, lo_inclusive=True, hi_inclusive=True):
+        """Yields (key, locator) pairs between lo and hi in ascending key order. A bound of None
+        leaves that side open. Only the pages on the path to the first leaf and the leaves
+        holding matching keys are read."""
+        if lo is not None:
+            lo = self.toKey(lo)
+        if hi is not None:
+            hi = self.toKey(hi)
+
+        if lo is None:
+            node = self._read(self.root)
+            while not node.leaf:
+                node = self._read(node.values[0])
+            i = 0
+        else:
+            path, node = self._findLeaf(lo)
+            i = bisect_left(node.keys, lo) if lo_inclusive else bisect_right(node.keys, lo)
+
+        while True:
+            while i < len(node.keys):
+                key = node.keys[i]
+                if hi is not None and (key > hi or (key == hi and not hi_inclusive)):
+                    return
+                yield key, node.values[i]
+                i += 1
+            if not node.next:
+                return
+            node = self._read(node.next)
+            i = 0
+
+class HashBucket(object):
+    """A bucket of a HashIndex, stored in one page of the index file."""
+    def __init__(self, pageNo, localDepth):
+        self.pageNo = pageNo
+        self.localDepth = localDepth
+        self.entries = {}
+        self.size = HASH_BUCKET_HEADER.size
+
+class HashIndex(PagedIndex):
+    """Extendible hash index on the primary key of a type, stored page by page in a file.
+    Page 0 is a header followed by the page numbers of the directory pages, the directory maps
+    the lowest globalDepth bits of the CRC-32 of a key to the page of its bucket. The directory
+    is read once when the index is opened, so a lookup reads at most the page of one bucket. A
+    bucket that no longer fits in INDEX_PAGE_SIZE is split in two on the next bit of the hash,
+    doubling the directory first if the bucket was the only one for its directory entries.
+    Deleted keys are removed from their bucket without merging buckets. Modified buckets are
+    cached and written back like the nodes of a PagedBPlusTree, the same IndexCache budget
+    applies to both. Keys are kept in no order, ordered scans are left to a B+ tree.
+    Attributes:
+        keyType (str): "int" or "str", the type of the primary key.
+        cache (IndexCache): The cache limiting how many buckets stay in memory, or None.
+        handles (FileHandlePool): Where the index file is opened, the one of the cache if given.
+    """
+    def __init__(self, fileName, cache=None):
+        self.fileName = fileName
+        self.cache = cache
+        self.handles = cache.handles if cache else FileHandlePool(1)
+        indexFile = self.handles.get(fileName)
+        indexFile.seek(0)
+        header = indexFile.read(INDEX_PAGE_SIZE)
+        magic, version, keyType, self.globalDepth, self.pageCount, self.keyCount, directoryPageNo = \
+            HASH_HEADER.unpack_from(header)
+        if magic != HASH_MAGIC or version != HASH_VERSION:
+            raise ValueError(fileName + ' is not a hash index file')
+        self.keyType = 'int' if keyType == 1 else 'str'
+        self.directoryPages = [INDEX_CHILD.unpack_from(header, HASH_HEADER.size + i * INDEX_CHILD.size)[0]
+                               for i in range(directoryPageNo)]
+        self.directory = []
+        for pageNo in self.directoryPages:
+            indexFile.seek(pageNo * INDEX_PAGE_SIZE)
+            data = indexFile.read(INDEX_PAGE_SIZE)
+            entryNo = min(HASH_DIRECTORY_ENTRIES, (1 << self.globalDepth) - len(self.directory))
+            self.directory.extend(struct.unpack_from('<' + str(entryNo) + 'I', data))
+        self.handles.counters.read(INDEX_PAGE_SIZE * (1 + directoryPageNo), directoryPageNo)
+        self.nodes = {}
+        self.dirty = set()
+        self.dirtyDirectoryPages = set()
+        self.headerDirty = False
+
+    @classmethod
+    def bulk_load(cls, fileName, keyType, pairs, cache=None):
+        """Creates an index file from (key, locator) pairs in any order and returns it opened.
+        The directory starts deep enough for the buckets to be about two thirds full, so few
+        buckets are split while the pairs are inserted in memory."""
+        if cache:
+            cache.handles.close(fileName)
+        pairs = list(pairs)
+        pairSize = sum(1 + len(value) + (INDEX_INT_KEY.size if keyType == 'int' else 1 + len(str(key).encode()))
+                       for key, value in pairs)
+        globalDepth = 0
+        while (1 << globalDepth) * INDEX_PAGE_SIZE * 2 // 3 < pairSize:
+            globalDepth += 1
+        bucketNo = 1 << globalDepth
+        directoryPageNo = -(-bucketNo // HASH_DIRECTORY_ENTRIES)
+        newFile = open(fileName, 'wb')
+        newFile.write(HASH_HEADER.pack(HASH_MAGIC, HASH_VERSION, 1 if keyType == 'int' else 0, globalDepth,
+                                       1 + bucketNo + directoryPageNo, 0, directoryPageNo).ljust(INDEX_PAGE_SIZE, b'\0'))
+        newFile.write(HASH_BUCKET_HEADER.pack(globalDepth, 0).ljust(INDEX_PAGE_SIZE, b'\0') * bucketNo)
+        for i in range(directoryPageNo):
+            entries = range(1 + i * HASH_DIRECTORY_ENTRIES, 1 + min(bucketNo, (i + 1) * HASH_DIRECTORY_ENTRIES))
+            newFile.write(struct.pack('<' + str(len(entries)) + 'I', *entries).ljust(INDEX_PAGE_SIZE, b'\0'))
+        newFile.seek(HASH_HEADER.size)
+        newFile.write(struct.pack('<' + str(directoryPageNo) + 'I', *range(1 + bucketNo, 1 + bucketNo + directoryPageNo)))
+        newFile.close()
+
+        index = cls(fileName)
+        for key, value in pairs:
+            index.insert(key, value)
+        index.flush()
+        indexFile = index.handles.get(fileName)
+        indexFile.flush()
+        os.fsync(indexFile.fileno())
+        index.close()
+        if cache:
+            cache.handles.counters.written(index.pageCount * INDEX_PAGE_SIZE, index.pageCount)
+        return cls(fileName, cache)
+
+    def flush(self):
+        """Writes every dirty bucket, the changed directory pages and the header back to the
+        index file. Directory pages needed by a grown directory are added at the end of the file."""
+        for pageNo in sorted(self.dirty):
+            self._writePage(self.nodes[pageNo])
+        self.dirty.clear()
+        if self.dirtyDirectoryPages:
+            while len(self.directoryPages) * HASH_DIRECTORY_ENTRIES < len(self.directory):
+                self.directoryPages.append(self.pageCount)
+                self.pageCount += 1
+                self.headerDirty = True
+            if self.cache and self.cache.wal:
+                self.cache.wal.force()
+            indexFile = self.handles.get(self.fileName)
+            for i in sorted(self.dirtyDirectoryPages):
+                entries = self.directory[i * HASH_DIRECTORY_ENTRIES:(i + 1) * HASH_DIRECTORY_ENTRIES]
+                indexFile.seek(self.directoryPages[i] * INDEX_PAGE_SIZE)
+                indexFile.write(struct.pack('<' + str(len(entries)) + 'I', *entries).ljust(INDEX_PAGE_SIZE, b'\0'))
+            self.handles.counters.written(INDEX_PAGE_SIZE * len(self.dirtyDirectoryPages), len(self.dirtyDirectoryPages))
+            self.dirtyDirectoryPages.clear()
+        if self.headerDirty:
+            if self.cache and self.cache.wal:
+                self.cache.wal.force()
+            indexFile = self.handles.get(self.fileName)
+            indexFile.seek(0)
+            indexFile.write(HASH_HEADER.pack(HASH_MAGIC, HASH_VERSION, 1 if self.keyType == 'int' else 0,
+                                             self.globalDepth, self.pageCount, self.keyCount, len(self.directoryPages)) +
+                            struct.pack('<' + str(len(self.directoryPages)) + 'I', *self.directoryPages))
+            self.handles.counters.written(INDEX_PAGE_SIZE, 0)
+            self.headerDirty = False
+
+    def discard(self):
+        self.dirtyDirectoryPages.clear()
+        PagedIndex.discard(self)
+
+    def _encodeKey(self, key):
+        if self.keyType == 'int':
+            return INDEX_INT_KEY.pack(key)
+        encoded = key.encode()
+        return bytes([len(encoded)]) + encoded
+
+    def _fits(self, key):
+        return self.keyType == 'int' or len(key.encode()) <= INDEX_MAX_KEY
+
+    def _entrySize(self, key, value):
+        return len(self._encodeKey(key)) + 1 + len(value.encode())
+
+    def _hash(self, key):
+        return zlib.crc32(self._encodeKey(key))
+
+    def _encodePage(self, bucket):
+        data = [HASH_BUCKET_HEADER.pack(bucket.localDepth, len(bucket.entries))]
+        for key, value in bucket.entries.items():
+            encoded = value.encode()
+            data.append(self._encodeKey(key) + bytes([len(encoded)]) + encoded)
+        return b''.join(data)
+
+    def _decode(self, pageNo, data):
+        localDepth, keyNo = HASH_BUCKET_HEADER.unpack_from(data)
+        bucket = HashBucket(pageNo, localDepth)
+        bucket.size = HASH_BUCKET_HEADER.size
+        offset = HASH_BUCKET_HEADER.size
+        for i in range(keyNo):
+            start = offset
+            if self.keyType == 'int':
+                key = INDEX_INT_KEY.unpack_from(data, offset)[0]
+                offset += INDEX_INT_KEY.size
+            else:
+                length = data[offset]
+                key = str(data[offset + 1:offset + 1 + length], 'utf-8')
+                offset += 1 + length
+            length = data[offset]
+            bucket.entries[key] = str(data[offset + 1:offset + 1 + length], 'utf-8')
+            offset += 1 + length
+            bucket.size += offset - start
+        return bucket
+
+    def _bucket(self, hashValue):
+        return self._read(self.directory[hashValue & ((1 << self.globalDepth) - 1)])
+
+    def _split(self, bucket):
+        """Moves the keys of a full bucket whose next hash bit is set to a new bucket."""
+        if bucket.localDepth == self.globalDepth:
+            if len(self.directory) * 2 > HASH_MAX_DIRECTORY_PAGES * HASH_DIRECTORY_ENTRIES:
+                raise ValueError('the directory of ' + self.fileName + ' cannot grow any further')
+            self.directory += self.directory
+            self.globalDepth += 1
+            self.dirtyDirectoryPages.update(range(-(-len(self.directory) // HASH_DIRECTORY_ENTRIES)))
+            self.headerDirty = True
+        bit = 1 << bucket.localDepth
+        bucket.localDepth += 1
+        newBucket = HashBucket(self.pageCount, bucket.localDepth)
+        self.pageCount += 1
+        self.headerDirty = True
+        for key in list(bucket.entries):
+            if self._hash(key) & bit:
+                value = bucket.entries.pop(key)
+                size = self._entrySize(key, value)
+                bucket.size -= size
+                newBucket.entries[key] = value
+                newBucket.size += size
+
+        #Only the directory entries sharing the low bits of the keys of the bucket point to it.
+        lowBits = self._hash(next(iter(newBucket.entries or bucket.entries))) & (bit - 1)
+        for i in range(lowBits | bit, len(self.directory), bit << 1):
+            self.directory[i] = newBucket.pageNo
+            self.dirtyDirectoryPages.add(i // HASH_DIRECTORY_ENTRIES)
+        self._write(bucket)
+        self._write(newBucket)
+
+    def retrieve(self, key):
+        """Returns the locator stored for a given key, and None if the key does not exist."""
+        try:
+            key = self.toKey(key)
+        except ValueError:
+            return None
+        if not self._fits(key):
+            return None
+        return self._bucket(self._hash(key)).entries.get(key)
+
+    def insert(self, key, value):
+        """Inserts a key-locator pair into its bucket, splitting it until it fits in a page."""
+        key = self.toKey(key)
+        if self.cache and self.cache.wal:
+            self.cache.wal.log("insert", self.fileName, key, value)
+        hashValue = self._hash(key)
+        bucket = self._bucket(hashValue)
+        oldValue = bucket.entries.get(key)
+        if oldValue is None:
+            self.keyCount += 1
+            self.headerDirty = True
+        else:
+            bucket.size -= self._entrySize(key, oldValue)
+        bucket.entries[key] = value
+        bucket.size += self._entrySize(key, value)
+        while bucket.size > INDEX_PAGE_SIZE:
+            self._split(bucket)
+            bucket = self._bucket(hashValue)
+        self._write(bucket)
+
+    def delete(self, key):
+        """Removes a key from its bucket. Returns the locator it pointed to, or None."""
+        try:
+            key = self.toKey(key)
+        except ValueError:
+            return None
+        if not self._fits(key):
+            return None
+        bucket = self._bucket(self._hash(key))
+        if key not in bucket.entries:
+            return None
+        if self.cache and self.cache.wal:
+            self.cache.wal.log("delete", self.fileName, key)
+        value = bucket.entries.pop(key)
+        bucket.size -= self._entrySize(key, value)
+        self.keyCount -= 1
+        self._write(bucket)
+        self.headerDirty = True
+        return value
+
+    def items(self):
+        """Yields every (key, locator) pair, bucket after bucket in no particular order."""
+        for pageNo in sorted(set(self.directory)):
+            for item in list(self._read(pageNo).entries.items()):
+                yield item
+
+class TypeIndex(object):
+    """The primary key indexes of a type with a hash index, used as one index. Lookups of a
+    single key go to the hash index. Ordered scans go to the B+ tree if the type has one as
+    well, and otherwise sort the entries of the hash index. Changes are made to both indexes.
+    """
+    def __init__(self, hashIndex, tree=None):
+        self.hashIndex = hashIndex
+        self.tree = tree
+        self.keyType = hashIndex.keyType
+
+    def toKey(self, key):
+        return self.hashIndex.toKey(key)
+
+    def retrieve(self, key):
+        return self.hashIndex.retrieve(key)
+
+    def insert(self, key, value):
+        self.hashIndex.insert(key, value)
+        if self.tree is not None:
+            self.tree.insert(key, value)
+
+    def delete(self, key):
+        value = self.hashIndex.delete(key)
+        if value is not None and self.tree is not None:
+            self.tree.delete(key)
+        return value
+
+    def items(self):
+        return self.range()
+
+    def range(self, lo=None, hi=None, lo_inclusive=True, hi_inclusive=True):
+        """Yields (key, locator) pairs between lo and hi in ascending key order, see
+        PagedBPlusTree.range()."""
+        if self.tree is not None:
+            return self.tree.range(lo, hi, lo_inclusive, hi_inclusive)
+        return self._scan(lo, hi, lo_inclusive, hi_inclusive)
+
+    def _scan(self, lo, hi, lo_inclusive, hi_inclusive):
+        if lo is not None:
+            lo = self.toKey(lo)
+        if hi is not None:
+            hi = self.toKey(hi)
+        for key, value in sorted(self.hashIndex.items()):
+            if lo is not None and (key < lo or (key == lo and not lo_inclusive)):
+                continue
+            if hi is not None and (key > hi or (key == hi and not hi_inclusive)):
+                return
+            yield key, value
+
+class IndexCache(object):
+    """Keeps the paged indexes opened during a run together with their nodes in memory.
+    Every node read or modified by any of the indexes counts against one memory budget. Once
+    the budget is exceeded the least recently used nodes are dropped, writing them back first
+    if they are dirty. Everything still dirty is written back by flush() at the end of the run.
+    Nodes modified by the current command are held in memory until the command is committed to
+    the write-ahead log, see releaseHeld().
+    Attributes:
+        maxNodes (int): The number of index pages that may stay in memory at once.
+        handles (FileHandlePool): Where the index files are opened.
+        wal (WriteAheadLog): Where changes to the indexes are logged, or None.
+    """
+    def __init__(self, maxBytes, handles, wal=None):
+        self.maxNodes = max(16, maxBytes // INDEX_PAGE_SIZE)
+        self.handles = handles
+        self.wal = wal
+        self.trees = {}
+        self.primaries = {}
+        self.lru = OrderedDict()
+        self.held = set()
+
+    def touch(self, tree, pageNo, hold=False):
+        self.lru[(tree, pageNo)] = None
+        self.lru.move_to_end((tree, pageNo))
+        if hold:
+            self.held.add((tree, pageNo))
+        self._shrink()
+
+    def _shrink(self):
+        while len(self.lru) > self.maxNodes:
+            for oldest in self.lru:
+                if oldest not in self.held:
+                    break
+            else:
+                # Everything left is held by the running command, go over budget until it commits.
+                return
+            del self.lru[oldest]
+            oldest[0]._evict(oldest[1])
+
+    def releaseHeld(self):
+        self.held.clear()
+        self._shrink()
+
+    def forget(self, tree):
+        for pageNo in tree.nodes:
+            self.lru.pop((tree, pageNo), None)
+            self.held.discard((tree, pageNo))
+
+    def open(self, typeName):
+        """Returns the primary key index of a type, opening it on first use, and None if it does
+        not exist. A type with a hash index gets a TypeIndex over its hash index and B+ tree."""
+        index = self.primaries.get(typeName)
+        if index is None:
+            tree = self.trees.get(indexFileName(typeName))
+            if tree is None:
+                tree = openIndex(typeName, self)
+                if tree is not None:
+                    self.trees[tree.fileName] = tree
+            hashIndex = self.openFile(hashIndexFileName(typeName))
+            index = TypeIndex(hashIndex, tree) if hashIndex is not None else tree
+            if index is not None:
+                self.primaries[typeName] = index
+        return index
+
+    def openFile(self, fileName):
+        """Returns the index stored in a file, or None if the file does not exist."""
+        tree = self.trees.get(fileName)
+        if tree is None and os.path.exists(fileName):
+            tree = indexClass(fileName)(fileName, self)
+            self.trees[fileName] = tree
+        return tree
+
+    def create(self, fileName, keyType):
+        if self.wal:
+            self.wal.log("create index", fileName, keyType)
+        self.primaries.clear()
+        tree = indexClass(fileName).create(fileName, keyType, self)
+        self.trees[fileName] = tree
+        return tree
+
+    def build(self, fileName, keyType, sorted_pairs):
+        """Creates an index file from pairs in ascending key order with a bulk load, replacing
+        the index stored in the file if there is one. The pages are written directly, so the
+        log is forced before."""
+        tree = self.trees.pop(fileName, None)
+        if tree is not None:
+            tree.discard()
+        self.primaries.clear()
+        if self.wal:
+            self.wal.force()
+        tree = indexClass(fileName).bulk_load(fileName, keyType, sorted_pairs, self)
+        self.trees[fileName] = tree
+        return tree
+
+    def drop(self, fileName):
+        """Forgets the cached nodes of an index without writing them and deletes its file once
+        the running command is committed."""
+        tree = self.openFile(fileName)
+        if tree is None:
+            return
+        if self.wal:
+            self.wal.log("drop index", fileName)
+        tree.discard()
+        del self.trees[fileName]
+        self.primaries.clear()
+        if self.wal:
+            self.wal.onCommit(lambda: os.remove(fileName))
+        else:
+            os.remove(fileName)
+
+    def flush(self):
+        for tree in self.trees.values():
+            tree.flush()
+
+    def close(self):
+        for tree in self.trees.values():
+            tree.close()
+        self.trees = {}
+        self.primaries = {}
+
+def indexFileName(typeName):
+    return 'B+' + typeName + '.idx'
+
+def hashIndexFileName(typeName):
+    return 'Hash#' + typeName + '.idx'
+
+def indexClass(fileName):
+    """Returns the class of the index stored in a file, told by the name of the file."""
+    return HashIndex if os.path.basename(fileName).startswith('Hash#') else PagedBPlusTree
+
+def secondaryIndexFileName(typeName, fieldName):
+    return 'B+' + typeName + '.' + fieldName + '.idx'
+
+def openIndex(typeName, cache=None):
+    """Opens the paged index of a type. A locator log "B+<typeName>.txt" written by older
+    versions is converted to the paged format the first time it is opened."""
+    fileName = indexFileName(typeName)
+    if os.path.exists(fileName):
+        return PagedBPlusTree(fileName, cache)
+
+    legacyFileName = 'B+' + typeName + '.txt'
+    if not os.path.exists(legacyFileName):
+        return None
+    typeInformation = typeCatalog.get(typeName)
+    if typeInformation is None:
+        return None
+    keyType = typeInformation.primaryKeyType()
+    pairs = {}
+    readLines = open(legacyFileName, 'r')
+    for tree_line in readLines:
+        if tree_line.strip():
+            key = tree_line.split("-")[0]
+            pairs[int(key) if keyType == 'int' else key] = tree_line.split("-")[1].strip()
+    readLines.close()
+    index = PagedBPlusTree.bulk_load(fileName, keyType, sorted(pairs.items()), cache)
+    os.remove(legacyFileName)
+    return index
+
+PAGES_PER_FILE = 3
+RECORDS_PER_PAGE = 10
+SLOT_WIDTH = 240
+BINARY_SLOT_WIDTH = 64
+RECORD_BATCH = 256
+FREE_SPACE_FILE = 'horadrimFreeSpace.txt'
+WAL_FILE = 'horadrimWAL.log'
+VACUUM_FILE = 'horadrimVacuum'
+
+# Pages are stored byte for byte the way the text files were written on Windows, every line ending
+# with "\r\n". A file starts with a header line describing its geometry, followed by its pages.
+# In the text format every page is a header line listing its empty slots and then one line per
+# slot. In the binary format a page starts with its number, its record count and a bitmap of its
+# empty slots, and every slot holds a length prefixed record with int fields stored as integers.
+LINE_END = b"\r\n"
+FILE_MAGIC = 'HORADRIM'
+FILE_VERSION = 2
+FILE_HEADER_SIZE = 64
+BINARY_PAGE_HEADER = struct.Struct('<IH')  # page number, record count, followed by the empty slot bitmap
+BINARY_LENGTH = struct.Struct('<H')
+BINARY_INT = struct.Struct('<q')
+
+def pageHeader(pageNo, emptySpots, slotsPerPage):
+    newEmptySpots = "-".join(str(spot) for spot in emptySpots)
+    newRecordNo = str(slotsPerPage - len(emptySpots))
+    return "PAGE:"+str(pageNo)+",Empty:" + newEmptySpots +",Records:"+newRecordNo
+
+class FileGeometry(object):
+    """Layout of a type or record file, read from the header line at the start of the file.
+    Files written before the header existed start directly with their first page and are read
+    with the fixed layout they were created with, 3 pages of 10 slots of 240 characters.
+    Attributes:
+        pagesPerFile (int): The number of pages in the file.
+        slotsPerPage (int): The number of records a page holds.
+        slotWidth (int): The number of bytes a record may take.
+        binary (bool): Whether pages are stored in the binary format instead of as text.
+        fileHeaderSize (int): The bytes before the first page, 0 for files without a header.
+        pageHeaderWidth (int): The bytes of a page header, wide enough to list every slot.
+        pageSize (int): The bytes a page takes on disk.
+    """
+    def __init__(self, pagesPerFile, slotsPerPage, slotWidth, binary=False, fileHeaderSize=FILE_HEADER_SIZE):
+        self.pagesPerFile = pagesPerFile
+        self.slotsPerPage = slotsPerPage
+        self.slotWidth = slotWidth
+        self.binary = binary
+        self.fileHeaderSize = fileHeaderSize
+        if binary:
+            self.lineEnd = b""
+            self.pageHeaderWidth = BINARY_PAGE_HEADER.size + (slotsPerPage + 7) // 8
+        else:
+            self.lineEnd = LINE_END
+            self.pageHeaderWidth = max(89, len(pageHeader(pagesPerFile, range(1, slotsPerPage + 1), slotsPerPage))
+                                       + len(str(slotsPerPage)))
+        self.pageSize = self.pageHeaderWidth + len(self.lineEnd) + slotsPerPage * (slotWidth + len(self.lineEnd))
+        self.fullBitmap = (1 << slotsPerPage) - 1
+
+    def pageOffset(self, pageNo):
+        return self.fileHeaderSize + (pageNo - 1) * self.pageSize
+
+    def slotOffset(self, slot):
+        """Returns where a slot starts within its page."""
+        return self.pageHeaderWidth + len(self.lineEnd) + (slot - 1) * (self.slotWidth + len(self.lineEnd))
+
+    def encodeHeader(self, pageNo, bitmap):
+        """Returns the page header of a page whose empty slots are the set bits of bitmap."""
+        if self.binary:
+            recordNo = self.slotsPerPage - bin(bitmap).count("1")
+            return BINARY_PAGE_HEADER.pack(pageNo, recordNo) + bitmap.to_bytes(self.pageHeaderWidth - BINARY_PAGE_HEADER.size, 'little')
+        emptySpots = [slot for slot in range(1, self.slotsPerPage + 1) if bitmap & (1 << (slot - 1))]
+        return pageHeader(pageNo, emptySpots, self.slotsPerPage).encode().ljust(self.pageHeaderWidth, b" ")
+
+    def decodeBitmap(self, header):
+        """Returns the empty slot bitmap stored in a page header."""
+        if self.binary:
+            return int.from_bytes(header[BINARY_PAGE_HEADER.size:self.pageHeaderWidth], 'little')
+        bitmap = 0
+        for spot in str(header, 'utf-8').split(",")[1].split(":")[1].split("-"):
+            if spot.strip():
+                bitmap |= 1 << (int(spot) - 1)
+        return bitmap
+
+    def emptyPage(self, pageNo):
+        emptySlot = b"\0" * self.slotWidth if self.binary else b" " * self.slotWidth + LINE_END
+        return self.encodeHeader(pageNo, self.fullBitmap) + self.lineEnd + emptySlot * self.slotsPerPage
+
+    def encode(self):
+        header = FILE_MAGIC + ":" + str(FILE_VERSION) + ",Pages:" + str(self.pagesPerFile) + \
+                 ",Slots:" + str(self.slotsPerPage) + ",Width:" + str(self.slotWidth) + \
+                 ",Format:" + ("binary" if self.binary else "text")
+        return header.encode().ljust(FILE_HEADER_SIZE - len(LINE_END), b" ") + LINE_END
+
+    @classmethod
+    def decode(cls, data):
+        """Returns the geometry described by the first bytes of a file."""
+        if data.startswith(b"PAGE:"):
+            return cls(PAGES_PER_FILE, RECORDS_PER_PAGE, SLOT_WIDTH, False, 0)
+        fields = dict(field.split(":") for field in data.decode().strip().split(","))
+        if FILE_MAGIC not in fields or int(fields[FILE_MAGIC]) != FILE_VERSION:
+            raise ValueError('not a Horadrim data file')
+        return cls(int(fields["Pages"]), int(fields["Slots"]), int(fields["Width"]),
+                   fields.get("Format", "text") == "binary")
+
+    def newFileGeometry(self):
+        """Returns the geometry new files of a database with this geometry are created with."""
+        return FileGeometry(self.pagesPerFile, self.slotsPerPage, self.slotWidth, self.binary)
+
+def packString(value):
+    encoded = value.encode()
+    if len(encoded) > 255:
+        raise ValueError('field longer than 255 bytes')
+    return bytes([len(encoded)]) + encoded
+
+def unpackString(data, offset):
+    length = data[offset]
+    return str(data[offset + 1:offset + 1 + length], 'utf-8'), offset + 1 + length
+
+def encodeRecord(geometry, kind, record):
+    """Returns the bytes a record line is stored as in a slot, or None if it cannot be stored
+    there. In the binary format a type is stored as its name, primary key order and fields, and a
+    record as its type name followed by its fields in the types given by the catalog."""
+    if not geometry.binary:
+        encoded = record.encode()
+        return encoded.ljust(geometry.slotWidth, b" ") if len(encoded) <= geometry.slotWidth else None
+    if not record:
+        return b"\0" * geometry.slotWidth
+
+    #The slot number at the start of the line is not stored, it is known from the position.
+    tokens = record.split()
+    try:
+        if kind == 'type':
+            data = [packString(tokens[1]), bytes([int(tokens[2]), (len(tokens) - 3) // 2])]
+            for i in range(3, len(tokens) - 1, 2):
+                data.append(packString(tokens[i]) + (b"\1" if tokens[i+1] == 'int' else b"\0"))
+        else:
+            typeInformation = typeCatalog.get(tokens[1])
+            if typeInformation is None or len(typeInformation.fields) != len(tokens) - 2:
+                return None
+            data = [packString(tokens[1])]
+            for (fieldName, fieldType), value in zip(typeInformation.fields, tokens[2:]):
+                data.append(BINARY_INT.pack(int(value)) if fieldType == 'int' else packString(value))
+    except (ValueError, struct.error):
+        return None
+    encoded = b"".join(data)
+    if BINARY_LENGTH.size + len(encoded) > geometry.slotWidth:
+        return None
+    return (BINARY_LENGTH.pack(len(encoded)) + encoded).ljust(geometry.slotWidth, b"\0")
+
+def decodeRecord(geometry, kind, slot, data):
+    """Returns the record line stored in a slot, the empty string for an empty slot."""
+    if not geometry.binary:
+        return str(data, 'utf-8').strip()
+    length = BINARY_LENGTH.unpack_from(data)[0]
+    if length == 0:
+        return ""
+    name, offset = unpackString(data, BINARY_LENGTH.size)
+    tokens = [str(slot), name]
+    if kind == 'type':
+        tokens.append(str(data[offset]))
+        offset += 2
+        while offset < BINARY_LENGTH.size + length:
+            fieldName, offset = unpackString(data, offset)
+            tokens += [fieldName, 'int' if data[offset] == 1 else 'str']
+            offset += 1
+    else:
+        for fieldName, fieldType in typeCatalog.get(name).fields:
+            if fieldType == 'int':
+                tokens.append(str(BINARY_INT.unpack_from(data, offset)[0]))
+                offset += BINARY_INT.size
+            else:
+                value, offset = unpackString(data, offset)
+                tokens.append(value)
+    return " ".join(tokens)
+
+class WriteAheadLog(object):
+    """Log of the changes made by every command, written before the changed pages reach disk.
+    A command adds its changes with log() while it runs and they are appended to the log file as
+    one line by commit(). The log file is synced once every groupSize commits, and always before
+    a modified page or index node is written back, so whatever is on disk can be redone from it.
+    Files removed by a command are only deleted after its commit is synced. After a crash the
+    changes are applied again by recoverDatabase(), every change sets a slot, an index key or a
+    file to its final value so applying a change twice is harmless.
+    Attributes:
+        groupSize (int): The number of commits sharing one sync of the log file.
+        commitCount (int): The number of commits with changes made during this run.
+    """
+    def __init__(self, fileName, groupSize=64):
+        self.fileName = fileName
+        self.groupSize = max(1, groupSize)
+        self.file = open(fileName, 'a')
+        self.changes = []
+        self.afterCommit = []
+        self.unsyncedCommits = 0
+        self.commitCount = 0
+        self.recovering = False
+
+    def log(self, *change):
+        if not self.recovering:
+            self.changes.append(list(change))
+
+    def onCommit(self, action):
+        """Runs an action that cannot be undone, such as removing a file, after the commit."""
+        if self.recovering:
+            action()
+        else:
+            self.afterCommit.append(action)
+
+    def commit(self, line):
+        if self.changes:
+            self.file.write(json.dumps({"command": line, "changes": self.changes}) + "\n")
+            self.changes = []
+            self.unsyncedCommits += 1
+            self.commitCount += 1
+        if self.unsyncedCommits >= self.groupSize or self.afterCommit:
+            self.force()
+        for action in self.afterCommit:
+            action()
+        self.afterCommit = []
+
+    def force(self):
+        if self.unsyncedCommits:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.unsyncedCommits = 0
+
+    def records(self):
+        """Yields the committed records in the log one at a time, so the log is never held in
+        memory as a whole. A torn last line is ignored."""
+        self.file.flush()
+        readLines = open(self.fileName, 'r')
+        try:
+            for wal_line in readLines:
+                try:
+                    record = json.loads(wal_line)
+                except ValueError:
+                    return
+                yield record
+        finally:
+            readLines.close()
+
+    def truncate(self):
+        self.file.close()
+        self.file = open(self.fileName, 'w')
+        self.unsyncedCommits = 0
+
+    def close(self):
+        self.force()
+        self.file.close()
+
+class OutputWriter(object):
+    """Collects the lines written to the output or log file and writes them in batches.
+    Attributes:
+        policy (str): When pending lines are written and flushed. "strict" does it for every
+            line, "command" at the end of every command, "batch" once flushLines lines or
+            flushBytes bytes are pending and "exit" only when the writer is closed.
+    """
+    def __init__(self, file, policy='batch', flushLines=1000, flushBytes=65536):
+        self.file = file
+        self.policy = policy
+        self.flushLines = flushLines
+        self.flushBytes = flushBytes
+        self.pending = []
+        self.pendingBytes = 0
+
+    def write(self, line):
+        self.pending.append(line + "\n")
+        self.pendingBytes += len(line) + 1
+        if self.policy == 'strict':
+            self.flush()
+        elif self.policy == 'batch' and (len(self.pending) >= self.flushLines or self.pendingBytes >= self.flushBytes):
+            self.flush()
+
+    def endCommand(self):
+        if self.policy == 'command':
+            self.flush()
+
+    def flush(self):
+        if self.file.closed:
+            return
+        if self.pending:
+            self.file.write("".join(self.pending))
+            self.pending = []
+            self.pendingBytes = 0
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+class CommandStats(object):
+    """Wall time and I/O of every command, taken from the IOCounters before and after it.
+    If an output is given a line is written to it for every command, and the totals of every
+    kind of command are kept for summary(). A profiler can be attached to chosen kinds of
+    command with attachProfiler().
+    Attributes:
+        counters (IOCounters): The counters shared by the buffer pool and the index cache.
+        output (OutputWriter): Where the line of every command is written, or None.
+    """
+    HEADER = 'time,command,succession,kind,seconds,' + ','.join(IOCounters.NAMES)
+
+    def __init__(self, counters, output=None):
+        self.counters = counters
+        self.output = output
+        self.kinds = {}
+        self.profiledKinds = set()
+        self.startProfiler = None
+        self.stopProfiler = None
+        self.current = None
+
+    def attachProfiler(self, kinds, start, stop):
+        """Calls start(kind, line) before and stop(kind, line) after every command of the given
+        kinds, for example the enable and disable of a cProfile.Profile or the start and stop of
+        a sampling timer."""
+        self.profiledKinds = set(kinds)
+        self.startProfiler = start
+        self.stopProfiler = stop
+
+    def begin(self, line):
+        """Starts measuring a command, returns what end() needs to finish it."""
+        if self.output is None and not self.profiledKinds:
+            return None
+        kind = commandKind(line)
+        if kind in self.profiledKinds:
+            self.startProfiler(kind, line)
+        self.current = (kind, time.perf_counter(), self.counters.snapshot())
+        return self.current
+
+    def end(self, line, succession):
+        if self.current is None:
+            return
+        kind, started, snapshot = self.current
+        self.current = None
+        seconds = time.perf_counter() - started
+        if kind in self.profiledKinds:
+            self.stopProfiler(kind, line)
+        if self.output is None:
+            return
+        counts = self.counters.since(snapshot)
+        totals = self.kinds.setdefault(kind, [0, 0.0] + [0] * len(counts))
+        totals[0] += 1
+        totals[1] += seconds
+        for i, count in enumerate(counts):
+            totals[2 + i] += count
+        self.output.write(','.join([str(int(time.time())), line, succession, kind, '%.6f' % seconds] +
+                                   [str(count) for count in counts]))
+
+    def summary(self):
+        """Returns the totals of every kind of command as lines of CSV."""
+        lines = ['kind,commands,seconds,meanMs,' + ','.join(IOCounters.NAMES)]
+        for kind in sorted(self.kinds):
+            totals = self.kinds[kind]
+            lines.append(','.join([kind, str(totals[0]), '%.6f' % totals[1], '%.4f' % (totals[1] * 1000 / totals[0])] +
+                                  [str(count) for count in totals[2:]]))
+        return "\n".join(lines)
+
+class Frame(object):
+    """A page of a type or record file held in the buffer pool."""
+    def __init__(self, data):
+        self.data = data
+        self.pinCount = 0
+        self.dirty = False
+
+class BufferPool(object):
+    """A fixed number of frames caching the pages of the type and record files.
+    Pages are pinned while they are used and the least recently used unpinned page is evicted
+    when a frame is needed, being written back first if it was modified. Everything still dirty
+    is written back by flush() at the end of the run. Pages modified by the current command stay
+    pinned until the command is committed to the write-ahead log, see releaseHeld().
+    Attributes:
+        frameNo (int): The maximum number of pages held in memory.
+        wal (WriteAheadLog): Forced to disk before any modified page is written, or None.
+    """
+    def __init__(self, frameNo, handles, wal=None):
+        self.frameNo = max(1, frameNo)
+        self.handles = handles
+        self.wal = wal
+        self.frames = OrderedDict()
+        self.held = []
+        self.geometries = {}
+
+    def geometry(self, file):
+        """Returns the geometry of a file, reading its header on first use."""
+        geometry = self.geometries.get(file)
+        if geometry is None:
+            readFrom = self.handles.get(file)
+            readFrom.seek(0)
+            geometry = FileGeometry.decode(readFrom.read(FILE_HEADER_SIZE))
+            self.handles.counters.read(FILE_HEADER_SIZE, 0)
+            self.geometries[file] = geometry
+        return geometry
+
+    def _readPage(self, file, pageNo):
+        geometry = self.geometry(file)
+        self.handles.counters.read(geometry.pageSize)
+        if self.handles.mapped:
+            offset = geometry.pageOffset(pageNo)
+            return bytearray(self.handles.map(file, offset + geometry.pageSize)[offset:offset + geometry.pageSize])
+        readFrom = self.handles.get(file)
+        readFrom.seek(geometry.pageOffset(pageNo))
+        return bytearray(readFrom.read(geometry.pageSize))
+
+    def _writePage(self, file, pageNo, frame):
+        if self.wal:
+            self.wal.force()
+        writeTo = self.handles.get(file)
+        writeTo.seek(self.geometry(file).pageOffset(pageNo))
+        writeTo.write(frame.data)
+        self.handles.counters.written(len(frame.data))
+        frame.dirty = False
+
+    def pin(self, file, pageNo):
+        """Returns the frame holding a page, reading the page in if needed, and pins it."""
+        frame = self.frames.get((file, pageNo))
+        if frame is None:
+            if len(self.frames) >= self.frameNo:
+                self._evict()
+            self.handles.counters.cacheMisses += 1
+            frame = Frame(self._readPage(file, pageNo))
+            self.frames[(file, pageNo)] = frame
+        else:
+            self.handles.counters.cacheHits += 1
+            self.frames.move_to_end((file, pageNo))
+        frame.pinCount += 1
+        return frame
+
+    def unpin(self, frame, dirty=False):
+        frame.pinCount -= 1
+        if dirty:
+            frame.dirty = True
+
+    def _evict(self):
+        for (file, pageNo), frame in self.frames.items():
+            if frame.pinCount == 0:
+                if frame.dirty:
+                    self._writePage(file, pageNo, frame)
+                del self.frames[(file, pageNo)]
+                return
+        # Every page is pinned, the pool grows past frameNo until pages are released again.
+
+    def _readFromPage(self, file, pageNo, read):
+        """Calls read with a view of a page and returns its result. If the files are memory
+        mapped, pages that are not in the pool are read straight from the mapping without taking
+        a frame or copying the page."""
+        if (file, pageNo) not in self.frames and self.handles.mapped:
+            geometry = self.geometry(file)
+            offset = geometry.pageOffset(pageNo)
+            self.handles.counters.cacheMisses += 1
+            self.handles.counters.read(geometry.pageSize)
+            with memoryview(self.handles.map(file, offset + geometry.pageSize)) as data:
+                return read(data[offset:offset + geometry.pageSize])
+        frame = self.pin(file, pageNo)
+        with memoryview(frame.data) as data:
+            result = read(data)
+        self.unpin(frame)
+        return result
+
+    def readBitmap(self, file, pageNo):
+        """Returns the bitmap of the empty slots of a page, read from its header."""
+        geometry = self.geometry(file)
+        return self._readFromPage(file, pageNo, lambda data: geometry.decodeBitmap(data[:geometry.pageHeaderWidth]))
+
+    def readSlot(self, file, pageNo, slot):
+        return self.readSlots(file, pageNo, [slot])[0]
+
+    def readSlots(self, file, pageNo, slots):
+        """Returns the contents of several slots of a page, pinning the page only once."""
+        geometry = self.geometry(file)
+        kind = FreeSpaceMap.kind(file)
+        return self._readFromPage(file, pageNo, lambda data: [
+            decodeRecord(geometry, kind, slot, data[geometry.slotOffset(slot):geometry.slotOffset(slot) + geometry.slotWidth])
+            for slot in slots])
+
+    def writeSlot(self, file, pageNo, slot, bitmap, record):
+        """Replaces a slot and the page header listing the empty slots of bitmap, the page is
+        written back later. The page stays pinned until releaseHeld() is called."""
+        self.writeSlots(file, pageNo, [(slot, record)], bitmap)
+
+    def writeSlots(self, file, pageNo, slotRecords, bitmap):
+        """Replaces several slots of a page given as (slot, record) pairs, pinning the page and
+        rewriting its header only once."""
+        geometry = self.geometry(file)
+        kind = FreeSpaceMap.kind(file)
+        frame = self.pin(file, pageNo)
+        frame.data[:geometry.pageHeaderWidth] = geometry.encodeHeader(pageNo, bitmap)
+        for slot, record in slotRecords:
+            frame.data[geometry.slotOffset(slot):geometry.slotOffset(slot) + geometry.slotWidth] = \
+                encodeRecord(geometry, kind, record)
+        frame.dirty = True
+        self.held.append(frame)
+
+    def releaseHeld(self):
+        """Unpins the pages modified since the last call, once their command is committed."""
+        for frame in self.held:
+            self.unpin(frame)
+        self.held = []
+        while len(self.frames) > self.frameNo and any(frame.pinCount == 0 for frame in self.frames.values()):
+            self._evict()
+
+    def dropFile(self, file):
+        """Forgets the pages of a file that is being removed without writing them."""
+        for key in [key for key in self.frames if key[0] == file]:
+            del self.frames[key]
+        self.geometries.pop(file, None)
+        self.handles.close(file)
+
+    def flush(self):
+        for (file, pageNo), frame in self.frames.items():
+            if frame.dirty:
+                self._writePage(file, pageNo, frame)
+
+class FreeSpaceMap(object):
+    """Free slots of every page of the type and record files.
+    For every page a bitmap of its free slots is kept, bit i being set when slot i+1 is free.
+    Pages with at least one free slot are also kept per kind of file, so finding a slot for a
+    new type or record is a dictionary lookup instead of a scan over every page header.
+    The map is saved to FREE_SPACE_FILE at the end of a run and removed while the program is
+    running, so after a crash it is simply rebuilt from the page headers.
+    """
+    def __init__(self):
+        self.pages = {}
+        self.available = {'type': {}, 'record': {}}
+        self.geometries = {}
+
+    @staticmethod
+    def kind(file):
+        return 'type' if file.startswith('types') else 'record'
+
+    def setPage(self, file, pageNo, bitmap):
+        self.pages[(file, pageNo)] = bitmap
+        if bitmap:
+            self.available[self.kind(file)][(file, pageNo)] = None
+        else:
+            self.available[self.kind(file)].pop((file, pageNo), None)
+
+    def addFile(self, file, geometry):
+        self.geometries[file] = geometry
+        for pageNo in range(1, geometry.pagesPerFile + 1):
+            self.setPage(file, pageNo, geometry.fullBitmap)
+
+    def removeFile(self, file):
+        for pageNo in range(1, self.geometries.pop(file).pagesPerFile + 1):
+            self.available[self.kind(file)].pop((file, pageNo), None)
+            self.pages.pop((file, pageNo), None)
+
+    def findSlot(self, kind):
+        """Returns (file, page number, slot number) of a free slot, or None if all pages are full."""
+        for file, pageNo in self.available[kind]:
+            bitmap = self.pages[(file, pageNo)]
+            return file, pageNo, (bitmap & -bitmap).bit_length()
+        return None
+
+    def take(self, file, pageNo, slot):
+        self.setPage(file, pageNo, self.pages[(file, pageNo)] & ~(1 << (slot - 1)))
+
+    def release(self, file, pageNo, slot):
+        self.setPage(file, pageNo, self.pages[(file, pageNo)] | (1 << (slot - 1)))
+
+    def emptySpots(self, file, pageNo):
+        bitmap = self.pages[(file, pageNo)]
+        return [slot for slot in range(1, self.geometries[file].slotsPerPage + 1) if bitmap & (1 << (slot - 1))]
+
+    def usedSpots(self, file, pageNo):
+        bitmap = self.pages[(file, pageNo)]
+        return [slot for slot in range(1, self.geometries[file].slotsPerPage + 1) if not bitmap & (1 << (slot - 1))]
+
+    def isFileEmpty(self, file):
+        geometry = self.geometries[file]
+        for pageNo in range(1, geometry.pagesPerFile + 1):
+            if self.pages[(file, pageNo)] != geometry.fullBitmap:
+                return False
+        return True
+
+    def save(self, fileName):
+        saveTo = open(fileName, 'w')
+        for (file, pageNo), bitmap in self.pages.items():
+            saveTo.write(file + " " + str(pageNo) + " " + str(bitmap) + "\n")
+        saveTo.close()
+
+    @classmethod
+    def load(cls, fileName, files):
+        """Loads the map saved by the last run, or rebuilds it from the page headers of the given
+        files if it is missing or does not describe exactly these files."""
+        freeSpaceMap = cls()
+        geometries = dict((file, bufferPool.geometry(file)) for file in files)
+        if os.path.exists(fileName):
+            readLines = open(fileName, 'r')
+            for map_line in readLines:
+                if map_line.strip():
+                    file, pageNo, bitmap = map_line.split()
+                    freeSpaceMap.setPage(file, int(pageNo), int(bitmap))
+            readLines.close()
+            os.remove(fileName)
+            if set(file for file, pageNo in freeSpaceMap.pages) == set(files):
+                freeSpaceMap.geometries = geometries
+                return freeSpaceMap
+            freeSpaceMap = cls()
+
+        freeSpaceMap.geometries = geometries
+        for file in files:
+            for i in range(geometries[file].pagesPerFile):
+                freeSpaceMap.setPage(file, i + 1, bufferPool.readBitmap(file, i + 1))
+        return freeSpaceMap
+
+class TypeInfo(object):
+    """Catalog entry of a type, parsed from its line in a type file.
+    Attributes:
+        file, pageNo, slot: Where the line of the type is stored.
+        primaryKeyOrder (int): The position of the primary key among the fields, starting from 1.
+        fields (list): (field name, field type) pairs in the order the type was created with.
+        indexedFields (list): The names of the fields with a secondary index.
+        primaryIndexes (list): The files of the indexes on the primary key, the B+ tree and or
+            the hash index.
+    """
+    def __init__(self, file, pageNo, record):
+        tokens = record.split()
+        self.file = file
+        self.pageNo = pageNo
+        self.slot = int(tokens[0])
+        self.name = tokens[1]
+        self.primaryKeyOrder = int(tokens[2])
+        self.record = record
+
+        #The line keeps the primary key first, put it back to its own position.
+        self.fields = [(tokens[i], tokens[i+1]) for i in range(5, len(tokens), 2)]
+        self.fields.insert(self.primaryKeyOrder - 1, (tokens[3], tokens[4]))
+        self.findIndexes()
+
+    def primaryKeyType(self):
+        return self.fields[self.primaryKeyOrder - 1][1]
+
+    def fieldPosition(self, fieldName):
+        """Returns the position of a field among the fields starting from 0, or None."""
+        for position, (name, fieldType) in enumerate(self.fields):
+            if name == fieldName:
+                return position
+        return None
+
+    def findIndexes(self):
+        self.indexedFields = [name for name, fieldType in self.fields
+                              if os.path.exists(secondaryIndexFileName(self.name, name))]
+        #A B+ tree still stored in the old locator log is converted when it is opened.
+        self.primaryIndexes = [fileName for fileName in (indexFileName(self.name), hashIndexFileName(self.name))
+                               if os.path.exists(fileName)] or [indexFileName(self.name)]
+
+class TypeCatalog(object):
+    """The system catalog, every type file is read once at startup and the types are kept in a
+    dictionary keyed by type name. It is updated together with the type files by create type
+    and delete type, so looking a type up never touches the disk.
+    """
+    def __init__(self):
+        self.types = {}
+
+    def get(self, typeName):
+        """Returns the TypeInfo of a type, or None if there is no such type."""
+        return self.types.get(typeName)
+
+    def add(self, file, pageNo, record):
+        typeInfo = TypeInfo(file, pageNo, record)
+        self.types[typeInfo.name] = typeInfo
+        return typeInfo
+
+    def remove(self, typeName):
+        del self.types[typeName]
+
+    def removeAt(self, file, pageNo, slot):
+        """Removes the type stored in a slot, if there is one."""
+        for typeInfo in list(self.types.values()):
+            if (typeInfo.file, typeInfo.pageNo, typeInfo.slot) == (file, pageNo, slot):
+                del self.types[typeInfo.name]
+
+    def names(self):
+        return sorted(self.types)
+
+    def findIndexes(self):
+        """Looks up again which fields have a secondary index, after the log has been redone."""
+        for typeInfo in self.types.values():
+            typeInfo.findIndexes()
+
+    @classmethod
+    def load(cls, files):
+        typeCatalog = cls()
+        for file in files:
+            for i in range(freeSpaceMap.geometries[file].pagesPerFile):
+                for slot in freeSpaceMap.usedSpots(file, i + 1):
+                    typeCatalog.add(file, i + 1, bufferPool.readSlot(file, i + 1, slot))
+        return typeCatalog
+
+def runClient(socketPath, inputFileName=None, outputFileName=None):
+    """Sends commands to a server started with "serve" and writes the output lines it returns.
+    The commands are read from a file, or from the standard input when none is given, and sent
+    one at a time. Every response is the output lines of the command, an empty line and
+    "success" or "failure". Returns 1 if a command failed, 0 otherwise."""
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.connect(socketPath)
+    responses = connection.makefile('r', encoding='utf-8', newline='\n')
+    commands = open(inputFileName) if inputFileName else sys.stdin
+    output = open(outputFileName, 'w') if outputFileName else sys.stdout
+    failed = 0
+    for line in commands:
+        line = line.strip()
+        if not line:
+            continue
+        connection.sendall((line + "\n").encode('utf-8'))
+        #Output lines are never empty, the empty line ends them.
+        for result in iter(responses.readline, "\n"):
+            if not result:
+                raise ConnectionError('the server closed the connection')
+            output.write(result)
+        if responses.readline() != "success\n":
+            failed = 1
+        #An interactive user sees the output of every command as soon as it is done.
+        if output is sys.stdout:
+            output.flush()
+    connection.close()
+    if output is not sys.stdout:
+        output.close()
+    return failed
+
+#"vacuum", "import", "serve" or "client" in place of the input and output files runs that tool instead of commands.
+mode = sys.argv[1] if sys.argv[1:2] in (['vacuum'], ['import'], ['serve'], ['client']) else 'run'
+
+#The client only talks to the server, it does not open the database.
+if mode == 'client':
+    parser = argparse.ArgumentParser(prog=os.path.basename(sys.argv[0]) + ' client')
+    parser.add_argument('socketPath', help='the Unix socket the server listens on')
+    parser.add_argument('inputFile', nargs='?', help='the commands to run (default: the standard input)')
+    parser.add_argument('outputFile', nargs='?', help='where the output is written (default: the standard output)')
+    args = parser.parse_args(sys.argv[2:])
+    sys.exit(runClient(args.socketPath, args.inputFile, args.outputFile))
+
+parser = argparse.ArgumentParser()
+if mode == 'vacuum':
+    parser.prog += ' vacuum'
+    parser.add_argument('--cluster', action='store_true',
+                        help='store the records of every type together in primary key order')
+elif mode == 'import':
+    parser.prog += ' import'
+    parser.add_argument('typeName')
+    parser.add_argument('csvFile', help='one record per row, with the fields in the order of the type')
+elif mode == 'serve':
+    parser.prog += ' serve'
+    parser.add_argument('socketPath', help='the Unix socket to listen on')
+else:
+    parser.add_argument('inputFile')
+    parser.add_argument('outputFile')
+if mode in ('run', 'serve'):
+    parser.add_argument('--checkpoint-commands', type=int, default=10000,
+                        help='write commands after which the write-ahead log is checkpointed (default: %(default)s)')
+parser.add_argument('--index-cache-kb', type=int, default=16384,
+                    help='memory budget shared by the B+ tree indexes of all types (default: %(default)s)')
+parser.add_argument('--buffer-frames', type=int, default=256,
+                    help='number of type and record pages kept in memory (default: %(default)s)')
+parser.add_argument('--max-open-files', type=int, default=64,
+                    help='number of data and index files kept open at once (default: %(default)s)')
+parser.add_argument('--flush-policy', choices=['strict', 'command', 'batch', 'exit'], default='batch',
+                    help='when output and log lines are written out: after every line, after every command, '
+                         'in batches or only at exit (default: %(default)s)')
+parser.add_argument('--flush-lines', type=int, default=1000,
+                    help='pending lines that trigger a write with the batch policy (default: %(default)s)')
+parser.add_argument('--flush-bytes', type=int, default=65536,
+                    help='pending bytes that trigger a write with the batch policy (default: %(default)s)')
+parser.add_argument('--group-commit', type=int, default=64,
+                    help='number of commands whose write-ahead log records share one fsync (default: %(default)s)')
+parser.add_argument('--pages-per-file', type=int, default=PAGES_PER_FILE,
+                    help='pages in every type and record file, only used when the database is created (default: %(default)s)')
+parser.add_argument('--slots-per-page', type=int, default=RECORDS_PER_PAGE,
+                    help='records in every page, only used when the database is created (default: %(default)s)')
+parser.add_argument('--slot-width', type=int,
+                    help='bytes a record may take, only used when the database is created (default: ' + str(SLOT_WIDTH) +
+                         ', or ' + str(BINARY_SLOT_WIDTH) + ' for the records of the binary format)')
+parser.add_argument('--mmap', action='store_true',
+                    help='read type, record and index pages through memory mappings instead of read calls')
+parser.add_argument('--workers', type=int, default=1,
+                    help='processes running consecutive list, search and filter commands in parallel (default: %(default)s)')
+parser.add_argument('--storage-format', choices=['text', 'binary'], default='text',
+                    help='how pages and records are stored, only used when the database is created (default: %(default)s)')
+parser.add_argument('--stats', metavar='FILE',
+                    help='write the wall time and I/O of every command to a CSV file and a summary per kind of command '
+                         'to the standard error at the end')
+parser.add_argument('--profile', metavar='KIND', action='append', default=[],
+                    help='run commands of this kind, for example "filter record", under cProfile; may be repeated')
+parser.add_argument('--profile-file', default='horadrimProfile.prof',
+                    help='where the cProfile statistics are written (default: %(default)s)')
+args = parser.parse_args(sys.argv[2:] if mode != 'run' else None)
+
+if mode == 'run':
+    outFile = OutputWriter(open(args.outputFile,'w'), args.flush_policy, args.flush_lines, args.flush_bytes)
+    inputFile = open(args.inputFile)
+else:
+    outFile = OutputWriter(sys.stdout, 'command')
+    inputFile = []
+logFile = OutputWriter(open('horadrimLog.csv', 'a'), args.flush_policy, args.flush_lines, args.flush_bytes)
+
+#Lines already produced are still written out if a command fails with an exception.
+atexit.register(outFile.flush)
+atexit.register(logFile.flush)
+writeAheadLog = WriteAheadLog(WAL_FILE, args.group_commit)
+atexit.register(writeAheadLog.force)
+ioCounters = IOCounters()
+statsFile = None
+if args.stats:
+    statsFile = OutputWriter(open(args.stats, 'a'), args.flush_policy, args.flush_lines, args.flush_bytes)
+    if statsFile.file.tell() == 0:
+        statsFile.write(CommandStats.HEADER)
+    atexit.register(statsFile.flush)
+commandStats = CommandStats(ioCounters, statsFile)
+profiler = None
+if args.profile:
+    profiler = cProfile.Profile()
+    commandStats.attachProfiler(args.profile, lambda kind, line: profiler.enable(), lambda kind, line: profiler.disable())
+fileHandles = FileHandlePool(args.max_open_files, args.mmap, ioCounters)
+indexCache = IndexCache(args.index_cache_kb * 1024, fileHandles, writeAheadLog)
+bufferPool = BufferPool(args.buffer_frames, fileHandles, writeAheadLog)
+
+def listDataFiles():
+    """Returns the type files and the record files in the working directory."""
+    dir_list = os.listdir(os.getcwd())
+
+    types_list = []
+    for l in dir_list:
+        if 'types' in l:
+            types_list.append(l)
+
+    records_list = []
+    for r in dir_list:
+        if 'records' in r:
+            records_list.append(r)
+
+    return types_list, records_list
+
+types_list, records_list = listDataFiles()
+
+def newFileGeometry(kind, files):
+    """Returns the geometry new type or record files are created with. New files follow the
+    geometry of the files of their kind already in the database, and otherwise the one the
+    database was created with. A packed record takes a fraction of a text line, so unless a slot
+    width is given the record files of the binary format get the narrower BINARY_SLOT_WIDTH."""
+    if files:
+        return bufferPool.geometry(sorted(files)[0]).newFileGeometry()
+    if types_list + records_list:
+        geometry = bufferPool.geometry(sorted(types_list + records_list)[0])
+        pagesPerFile, slotsPerPage, slotWidth, binary = \
+            geometry.pagesPerFile, geometry.slotsPerPage, geometry.slotWidth, geometry.binary
+    else:
+        pagesPerFile, slotsPerPage, slotWidth, binary = \
+            args.pages_per_file, args.slots_per_page, args.slot_width or SLOT_WIDTH, args.storage_format == 'binary'
+    if binary and kind == 'record':
+        slotWidth = args.slot_width or BINARY_SLOT_WIDTH
+    return FileGeometry(pagesPerFile, slotsPerPage, slotWidth, binary)
+
+databaseGeometry = {'type': newFileGeometry('type', types_list), 'record': newFileGeometry('record', records_list)}
+
+freeSpaceMap = FreeSpaceMap.load(FREE_SPACE_FILE, types_list + records_list)
+
+def log(line, succession):
+    writeAheadLog.commit(line)
+    bufferPool.releaseHeld()
+    indexCache.releaseHeld()
+    commandStats.end(line, succession)
+
+    logFile.write(str(int(time.time())) + ',' + line + ',' + succession)
+
+    #Every command ends with its log line.
+    outFile.endCommand()
+    logFile.endCommand()
+
+def whichOperation(tokens):
+    if tokens[0] == 'create':
+        if tokens[1] == 'type':
+            return 1
+        elif tokens[1] == 'record':
+            return 4
+        elif tokens[1] == 'index':
+            return 10
+
+    elif tokens[0] == 'delete':
+        if tokens[1] == 'type':
+            return 2
+        elif tokens[1] == 'record':
+            return 5
+
+    elif tokens[0] == 'list':
+        if tokens[1] == 'type':
+            return 3
+        elif tokens[1] == 'record':
+            return 8
+    
+    elif tokens[0] == 'update':
+        return 6
+
+    elif tokens[0] == 'search':
+        return 7
+
+    elif tokens[0] == 'filter':
+        return 9
+
+OPERATION_NAMES = {1: 'create type', 2: 'delete type', 3: 'list type', 4: 'create record', 5: 'delete record',
+                   6: 'update record', 7: 'search record', 8: 'list record', 9: 'filter record', 10: 'create index'}
+
+def commandKind(line):
+    """Returns the kind of a command, such as "create record", under which its stats are summed."""
+    tokens = line.split()
+    try:
+        type = whichOperation(tokens)
+    except IndexError:
+        type = None
+    return OPERATION_NAMES.get(type, tokens[0] if tokens else '')
+
+def writeSlot(file, pageNo, slot, lineToAdd):
+    """Writes a slot together with the page header rebuilt from the free space map."""
+    writeAheadLog.log("slot", file, pageNo, slot, lineToAdd)
+    bufferPool.writeSlot(file, pageNo, slot, freeSpaceMap.pages[(file, pageNo)], lineToAdd)
+
+def fitsInSlot(file, lineToAdd):
+    """Returns whether a type or record line can be stored in the slots of a file."""
+    return encodeRecord(bufferPool.geometry(file), FreeSpaceMap.kind(file), lineToAdd) is not None
+
+def fitsInIndexes(typeInformation, fields, primaryKey):
+    """Returns whether the keys a record gets in the indexes of its type fit in an index entry."""
+    keys = [primaryKey] + [secondaryKey(typeInformation, fieldName, fields, primaryKey)
+                           for fieldName in typeInformation.indexedFields]
+    return all(key is None or len(str(key).encode()) <= INDEX_MAX_KEY for key in keys)
+
+def readRecord(data):
+    """Returns the field values of the record a locator points to."""
+    file,pageNo,record = data.split(":")[0],int(data.split(":")[1]),int(data.split(":")[2])
+    return bufferPool.readSlot(file, pageNo, record).split(" ")[2:]
+
+def readRecords(locators):
+    """Returns the field values of the records the locators point to, in the order of the
+    locators. The locators are grouped by page and the pages are visited in file order, so each
+    needed page is read once however many of the records it holds."""
+    wanted = {}
+    for position, data in enumerate(locators):
+        file,pageNo,record = data.split(":")[0],int(data.split(":")[1]),int(data.split(":")[2])
+        wanted.setdefault((file, pageNo), []).append((record, position))
+
+    results = [None] * len(locators)
+    for file, pageNo in sorted(wanted):
+        slots = wanted[(file, pageNo)]
+        records = bufferPool.readSlots(file, pageNo, [record for record, position in slots])
+        for (record, position), searchedRecord in zip(slots, records):
+            results[position] = searchedRecord.split(" ")[2:]
+    return results
+
+def orderedString(fieldType, value):
+    """Returns a field value as a string whose order is the order of the values of the field type.
+    Raises ValueError for an int field value that is not a number."""
+    if fieldType == 'int':
+        return "%016x" % (int(value) + (1 << 63))
+    return str(value)
+
+def secondaryKey(typeInformation, fieldName, fields, primaryKey):
+    """Returns the key a record is stored under in the index of a field: the field value followed
+    by the primary key, so that records sharing a value get distinct keys ordered by the value
+    and then by the primary key. Int values and int primary keys are written as fixed width
+    hexadecimal so that their string order is their numeric order. An empty primary key gives the
+    prefix shared by the keys of a value. Returns None if the record has no valid value for the
+    field."""
+    position = typeInformation.fieldPosition(fieldName)
+    if position >= len(fields):
+        return None
+    try:
+        value = orderedString(typeInformation.fields[position][1], fields[position])
+        if primaryKey != "":
+            primaryKey = orderedString(typeInformation.primaryKeyType(), primaryKey)
+    except ValueError:
+        return None
+    return value + "\0" + primaryKey
+
+def updateSecondaryIndexes(typeInformation, primaryKey, oldFields, newFields, locator):
+    """Moves a record in the indexes of its fields from its old field values to its new ones.
+    oldFields is None for a new record and newFields is None for a deleted one."""
+    for fieldName in typeInformation.indexedFields:
+        oldKey = secondaryKey(typeInformation, fieldName, oldFields, primaryKey) if oldFields else None
+        newKey = secondaryKey(typeInformation, fieldName, newFields, primaryKey) if newFields else None
+        if oldKey == newKey:
+            continue
+        bplustree = indexCache.openFile(secondaryIndexFileName(typeInformation.name, fieldName))
+        if oldKey is not None:
+            bplustree.delete(oldKey)
+        if newKey is not None:
+            bplustree.insert(newKey, locator)
+
+def buildSecondaryIndex(typeInformation, fieldName):
+    """Builds the index of a field from every record of a type with a single bulk load. While the
+    log is redone the records may be newer than the primary index, so records whose primary key
+    does not match the key pointing to them are left to the redone changes that follow. Returns
+    False without building the index if the value of a record is too long for an index key."""
+    items = list(indexCache.open(typeInformation.name).items())
+    pairs = []
+    for (key, data), fields in zip(items, readRecords([data for key, data in items])):
+        if writeAheadLog.recovering and fields[typeInformation.primaryKeyOrder - 1:typeInformation.primaryKeyOrder] != [str(key)]:
+            continue
+        indexKey = secondaryKey(typeInformation, fieldName, fields, key)
+        if indexKey is not None:
+            pairs.append((indexKey, data))
+    if any(len(indexKey.encode()) > INDEX_MAX_KEY for indexKey, data in pairs):
+        return False
+    pairs.sort()
+    indexCache.build(secondaryIndexFileName(typeInformation.name, fieldName), 'str', pairs)
+    return True
+
+CONDITION_OPERATORS = re.compile(r'(<=|>=|!=|=|<|>)')
+MIRRORED_OPERATORS = {'<': '>', '>': '<', '<=': '>=', '>=': '<=', '=': '=', '!=': '!='}
+
+def parseCondition(typeInformation, condition):
+    """Splits a filter condition into (field position, operator, value) comparisons, the values
+    converted to the type of their field. The condition is a conjunction of comparisons joined by
+    "&" or "and", each either "<field><operator><value>" or a range "<value><operator><field>
+    <operator><value>" such as "5<age<=100". The operators are =, !=, <, <=, > and >=. A field
+    name that is no field of the type stands for the primary key. Returns None if the condition
+    cannot be parsed or a value does not fit the type of its field."""
+    comparisons = []
+    for part in re.split(r'\s+and\s+|&', condition.strip()):
+        tokens = [token.strip() for token in CONDITION_OPERATORS.split(part)]
+        if len(tokens) == 3:
+            fieldName = tokens[0]
+            bounds = [(tokens[1], tokens[2])]
+        elif len(tokens) == 5:
+            fieldName = tokens[2]
+            bounds = [(MIRRORED_OPERATORS[tokens[1]], tokens[0]), (tokens[3], tokens[4])]
+        else:
+            return None
+        position = typeInformation.fieldPosition(fieldName)
+        if position is None:
+            position = typeInformation.primaryKeyOrder - 1
+        for operator, value in bounds:
+            if not value:
+                return None
+            if typeInformation.fields[position][1] == 'int':
+                try:
+                    value = int(value)
+                except ValueError:
+                    return None
+            comparisons.append((position, operator, value))
+    return comparisons
+
+def compare(value, operator, valueToCheck):
+    if operator == "=":
+        return value == valueToCheck
+    if operator == "!=":
+        return value != valueToCheck
+    if operator == "<":
+        return value < valueToCheck
+    if operator == "<=":
+        return value <= valueToCheck
+    if operator == ">":
+        return value > valueToCheck
+    return value >= valueToCheck
+
+def scanBounds(comparisons, position):
+    """Returns the narrowest (lo, hi, lo inclusive, hi inclusive) range of a field satisfying
+    every =, <, <=, > and >= comparison on it. A bound of None leaves that side open."""
+    lo = hi = None
+    loInclusive = hiInclusive = True
+    for comparisonPosition, operator, value in comparisons:
+        if comparisonPosition != position:
+            continue
+        if operator in ("=", ">", ">=") and (lo is None or value > lo or (value == lo and operator == ">")):
+            lo, loInclusive = value, operator != ">"
+        if operator in ("=", "<", "<=") and (hi is None or value < hi or (value == hi and operator == "<")):
+            hi, hiInclusive = value, operator != "<"
+    return lo, hi, loInclusive, hiInclusive
+
+def matchingRecords(typeInformation, bplustree, condition):
+    """Yields the fields of the records satisfying a filter condition, see parseCondition(), in
+    the order of the index that is scanned.
+    The bounds of the comparisons on one field are pushed down into a single ordered scan: of
+    the primary index if the primary key is bounded, else of the index of a bounded indexed
+    field, else of every record. The comparisons the scan does not cover are checked on the
+    records it returns."""
+    comparisons = parseCondition(typeInformation, condition)
+    if not comparisons:
+        return
+    primaryKeyPosition = typeInformation.primaryKeyOrder - 1
+    bounded = [position for position, operator, value in comparisons if operator != "!="]
+    indexed = [position for position in bounded
+               if typeInformation.fields[position][0] in typeInformation.indexedFields]
+    if primaryKeyPosition in bounded:
+        position = primaryKeyPosition
+        items = bplustree.range(*scanBounds(comparisons, position))
+    elif indexed:
+        position = indexed[0]
+        lo, hi, loInclusive, hiInclusive = scanBounds(comparisons, position)
+        fieldName = typeInformation.fields[position][0]
+        if lo is not None:
+            lo = secondaryKey(typeInformation, fieldName, [lo] * (position + 1), "")[:-1] + ("\0" if loInclusive else "\1")
+        if hi is not None:
+            hi = secondaryKey(typeInformation, fieldName, [hi] * (position + 1), "")[:-1] + ("\1" if hiInclusive else "")
+        secondaryIndex = indexCache.openFile(secondaryIndexFileName(typeInformation.name, fieldName))
+        items = secondaryIndex.range(lo, hi, True, False)
+    else:
+        position = None
+        items = bplustree.items()
+
+    residual = [(comparisonPosition, operator, value) for comparisonPosition, operator, value in comparisons
+                if comparisonPosition != position or operator == "!="]
+    for fields in streamRecords(data for key, data in items):
+        for comparisonPosition, operator, value in residual:
+            if comparisonPosition >= len(fields):
+                break
+            fieldValue = fields[comparisonPosition]
+            if typeInformation.fields[comparisonPosition][1] == 'int':
+                try:
+                    fieldValue = int(fieldValue)
+                except ValueError:
+                    break
+            if not compare(fieldValue, operator, value):
+                break
+        else:
+            yield fields
+
+def streamRecords(locators, batchSize=RECORD_BATCH):
+    """Yields the field values of the records the locators point to, in the order of the
+    locators. The locators are taken batchSize at a time and every batch is read page by page
+    with readRecords(), so memory stays bounded however many records there are."""
+    batch = []
+    for data in locators:
+        batch.append(data)
+        if len(batch) == batchSize:
+            yield from readRecords(batch)
+            batch = []
+    yield from readRecords(batch)
+
+def deleteRecord(data):
+    file,pageNo,record = data.split(":")[0],int(data.split(":")[1]),int(data.split(":")[2])
+
+    freeSpaceMap.release(file, pageNo, record)
+    writeSlot(file, pageNo, record, "")
+
+    removeFileIfEmpty(file)               
+
+def clearSlots(file, pageNo, slots):
+    """Empties several slots of a page with a single log entry and header rewrite."""
+    writeAheadLog.log("clear slots", file, pageNo, slots)
+    for slot in slots:
+        freeSpaceMap.release(file, pageNo, slot)
+    bufferPool.writeSlots(file, pageNo, [(slot, "") for slot in slots], freeSpaceMap.pages[(file, pageNo)])
+
+def deleteRecords(locators):
+    """Deletes many records at once. The locators are grouped by page so that every affected page
+    is changed once, and the files left empty are removed in one sweep at the end."""
+    wanted = {}
+    for data in locators:
+        file,pageNo,record = data.split(":")[0],int(data.split(":")[1]),int(data.split(":")[2])
+        wanted.setdefault((file, pageNo), []).append(record)
+
+    for file, pageNo in sorted(wanted):
+        clearSlots(file, pageNo, wanted[(file, pageNo)])
+
+    for file in sorted(set(file for file, pageNo in wanted)):
+        removeFileIfEmpty(file)
+
+def findTypeFile():
+    place = freeSpaceMap.findSlot('type')
+    if place is None:
+        createNewFile('type')
+        place = freeSpaceMap.findSlot('type')
+    return place
+
+def findRecordFile():
+    place = freeSpaceMap.findSlot('record')
+    if place is None:
+        createNewFile('record')
+        place = freeSpaceMap.findSlot('record')
+    return place
+
+def createNewFile(method):
+    filename = ''
+
+    if method == 'type':
+        filename = 'types' + str(len(types_list)+1) + '.txt'
+        for i in range(len(types_list)):
+            filenamecheck = 'types'+str(i+1)+'.txt'
+            if filenamecheck not in types_list:
+                filename = filenamecheck
+
+    elif method == 'record':
+        filename = 'records' + str(len(records_list)+1) + '.txt'
+        for i in range(len(records_list)):
+            filenamecheck = 'records'+str(i+1)+'.txt'
+            if filenamecheck not in records_list:
+                filename = filenamecheck
+
+    return createFile(filename)
+
+def createFile(filename):
+    if 'types' in filename:
+        types_list.append(filename)
+    elif 'records' in filename:
+        records_list.append(filename)
+
+    geometry = databaseGeometry['type' if 'types' in filename else 'record']
+    file = open(filename, 'wb')
+    file.write(geometry.encode())
+    for i in range(geometry.pagesPerFile):
+        file.write(geometry.emptyPage(i+1))
+    file.close()
+    ioCounters.written(geometry.fileHeaderSize + geometry.pagesPerFile * geometry.pageSize, geometry.pagesPerFile)
+    freeSpaceMap.addFile(filename, geometry)
+
+    return filename
+
+def removeFileIfEmpty(filename):
+    if not freeSpaceMap.isFileEmpty(filename):
+        return 'file is not empty'
+    if 'types' in filename:
+        types_list.remove(filename)
+    elif 'records' in filename: 
+        records_list.remove(filename)
+    freeSpaceMap.removeFile(filename)
+    bufferPool.dropFile(filename)
+    writeAheadLog.log("remove file", filename)
+    writeAheadLog.onCommit(lambda: os.remove(filename))
+
+def redo(change):
+    """Applies a change read back from the write-ahead log."""
+    if change[0] == "slot":
+        file, pageNo, slot, lineToAdd = change[1:]
+        if file not in types_list and file not in records_list:
+            createFile(file)
+        if lineToAdd:
+            freeSpaceMap.take(file, pageNo, slot)
+        else:
+            freeSpaceMap.release(file, pageNo, slot)
+        writeSlot(file, pageNo, slot, lineToAdd)
+        if FreeSpaceMap.kind(file) == 'type':
+            typeCatalog.removeAt(file, pageNo, slot)
+            if lineToAdd:
+                typeCatalog.add(file, pageNo, lineToAdd)
+
+    elif change[0] == "clear slots":
+        file, pageNo, slots = change[1:]
+        if file in types_list or file in records_list:
+            clearSlots(file, pageNo, slots)
+
+    elif change[0] == "swap files":
+        swapFiles(change[1], change[2])
+
+    elif change[0] == "remove file":
+        if change[1] in types_list or change[1] in records_list:
+            removeFileIfEmpty(change[1])
+
+    elif change[0] == "create index":
+        if not os.path.exists(change[1]):
+            indexCache.create(change[1], change[2])
+
+    elif change[0] == "drop index":
+        indexCache.drop(change[1])
+
+    elif change[0] == "build index":
+        typeInformation = typeCatalog.get(change[1])
+        if typeInformation != None and indexCache.open(change[1]) != None:
+            #The index is built from the primary index, which is not redone if it is only a hash index.
+            if indexFileName(change[1]) not in typeInformation.primaryIndexes:
+                rebuildHashIndexes([change[1]])
+            buildSecondaryIndex(typeInformation, change[2])
+
+    elif (change[0] == "insert" or change[0] == "delete") and indexClass(change[1]) is HashIndex:
+        #Hash indexes are rebuilt from the records once the log has been redone.
+        pass
+
+    elif change[0] == "insert" or change[0] == "delete":
+        bplustree = indexCache.openFile(change[1])
+        if bplustree != None:
+            if change[0] == "insert":
+                bplustree.insert(change[2], change[3])
+            else:
+                bplustree.delete(change[2])
+
+def checkpoint():
+    """Writes every modified page and index node to disk, after which the log can be emptied."""
+    indexCache.flush()
+    bufferPool.flush()
+    fileHandles.sync()
+    writeAheadLog.truncate()
+
+def recoverDatabase():
+    """Redoes the changes left in the write-ahead log by a run that did not finish."""
+    redone = False
+    writeAheadLog.recovering = True
+    for record in writeAheadLog.records():
+        for change in record["changes"]:
+            redo(change)
+        redone = True
+    writeAheadLog.recovering = False
+    if not redone:
+        return
+    bufferPool.releaseHeld()
+    indexCache.releaseHeld()
+    typeCatalog.findIndexes()
+    rebuildHashIndexes()
+    checkpoint()
+
+def rebuildHashIndexes(typeNames=None):
+    """Rebuilds the hash indexes from the record files after a run that did not finish. Buckets
+    split before the crash may have reached the disk without the directory pointing to them, so
+    the file of a hash index is not redone like a B+ tree but loaded again from the records. The
+    log is only emptied after this, so a crash while rebuilding rebuilds again. While the log is
+    redone, the hash index of a type without a B+ tree is rebuilt before the index of one of its
+    fields is built from it; typeNames limits the rebuild to these types."""
+    hashedTypes = dict((typeName, typeInformation) for typeName, typeInformation in typeCatalog.types.items()
+                       if hashIndexFileName(typeName) in typeInformation.primaryIndexes and
+                       (typeNames is None or typeName in typeNames))
+    if not hashedTypes:
+        return
+    pairs = dict((typeName, []) for typeName in hashedTypes)
+    for file in records_list:
+        for pageNo in range(1, freeSpaceMap.geometries[file].pagesPerFile + 1):
+            slots = freeSpaceMap.usedSpots(file, pageNo)
+            if not slots:
+                continue
+            for slot, record in zip(slots, bufferPool.readSlots(file, pageNo, slots)):
+                tokens = record.split()
+                typeInformation = hashedTypes.get(tokens[1])
+                if typeInformation is not None:
+                    pairs[tokens[1]].append((tokens[1 + typeInformation.primaryKeyOrder], file + ":" + str(pageNo) + ":" + str(slot)))
+    for typeName, typeInformation in hashedTypes.items():
+        indexCache.build(hashIndexFileName(typeName), typeInformation.primaryKeyType(), pairs[typeName])
+
+def newFileNames(kind, taken):
+    """Yields the names of type or record files in increasing number, skipping the taken ones."""
+    fileNo = 1
+    while True:
+        fileName = ('types' if kind == 'type' else 'records') + str(fileNo) + '.txt'
+        if fileName not in taken:
+            yield fileName
+        fileNo += 1
+
+def removeTemporaryFiles():
+    """Removes the files left by a vacuum or import that did not commit."""
+    for fileName in os.listdir(os.getcwd()):
+        if fileName.startswith(VACUUM_FILE):
+            os.remove(fileName)
+
+def packFiles(kind, lines, renames, fileNames):
+    """Writes lines densely into new files of the database geometry of kind named from fileNames. The
+    files are written under temporary names and (temporary name, final name) pairs are added to
+    renames. Every line is given without its slot number. Returns the locators of the lines."""
+    geometry = databaseGeometry[kind]
+    perFile = geometry.pagesPerFile * geometry.slotsPerPage
+    locators = []
+    pages = None
+    for i, line in enumerate(lines):
+        position = i % perFile
+        if position == 0:
+            if pages is not None:
+                writePackedFile(renames[-1][0], geometry, pages, perFile)
+            finalName = next(fileNames)
+            renames.append((VACUUM_FILE + str(len(renames) + 1) + '.tmp', finalName))
+            pages = [bytearray(geometry.emptyPage(pageNo)) for pageNo in range(1, geometry.pagesPerFile + 1)]
+        pageNo, slot = position // geometry.slotsPerPage + 1, position % geometry.slotsPerPage + 1
+        encoded = encodeRecord(geometry, kind, str(slot) + " " + line)
+        if encoded is None:
+            raise ValueError(line + ' does not fit in a slot')
+        pages[pageNo - 1][geometry.slotOffset(slot):geometry.slotOffset(slot) + geometry.slotWidth] = encoded
+        locators.append(finalName + ":" + str(pageNo) + ":" + str(slot))
+    if pages is not None:
+        writePackedFile(renames[-1][0], geometry, pages, (len(locators) - 1) % perFile + 1)
+    return locators
+
+def writePackedFile(fileName, geometry, pages, recordNo):
+    """Writes a file whose first recordNo slots are taken, with page headers to match."""
+    newFile = open(fileName, 'wb')
+    newFile.write(geometry.encode())
+    for i, page in enumerate(pages):
+        usedNo = min(max(recordNo - i * geometry.slotsPerPage, 0), geometry.slotsPerPage)
+        page[:geometry.pageHeaderWidth] = geometry.encodeHeader(i + 1, geometry.fullBitmap & ~((1 << usedNo) - 1))
+        newFile.write(page)
+    newFile.flush()
+    os.fsync(newFile.fileno())
+    newFile.close()
+    ioCounters.written(geometry.fileHeaderSize + len(pages) * geometry.pageSize, len(pages))
+
+def vacuum(cluster):
+    """Rewrites the database with the live types and records packed into the fewest files, and
+    the indexes bulk loaded to point to the new places. Records stay in the order of their pages,
+    or with cluster the records of every type are stored together in primary key order. The new
+    files are written under temporary names and moved in place by swapFiles() once the command
+    is committed, so a crash leaves either the old or the new database. Returns a report of the
+    space reclaimed."""
+    checkpoint()
+    removeTemporaryFiles()
+
+    typeNames = typeCatalog.names()
+    indexFiles = [fileName for typeName in typeNames for fileName in typeCatalog.get(typeName).primaryIndexes] + \
+                 [secondaryIndexFileName(typeName, fieldName)
+                  for typeName in typeNames for fieldName in typeCatalog.get(typeName).indexedFields]
+    oldFiles = types_list + records_list
+    sizeBefore = sum(os.path.getsize(fileName) for fileName in oldFiles + indexFiles if os.path.exists(fileName))
+
+    renames = []
+    packFiles('type', [typeCatalog.get(typeName).record.split(" ", 1)[1] for typeName in typeNames], renames,
+              newFileNames('type', []))
+    typeFileNo = len(renames)
+
+    entries = []
+    for typeName in typeNames:
+        bplustree = indexCache.open(typeName)
+        if bplustree != None:
+            entries += [(typeName, key, data) for key, data in bplustree.items()]
+    if not cluster:
+        entries.sort(key=lambda entry: (entry[2].split(":")[0], int(entry[2].split(":")[1]), int(entry[2].split(":")[2])))
+
+    #Secondary index keys are collected while the records stream by, with the position of the record.
+    secondaryKeys = {}
+    def recordLines():
+        for position, ((typeName, key, data), fields) in enumerate(zip(entries, streamRecords(data for typeName, key, data in entries))):
+            typeInformation = typeCatalog.get(typeName)
+            for fieldName in typeInformation.indexedFields:
+                indexKey = secondaryKey(typeInformation, fieldName, fields, key)
+                if indexKey is not None:
+                    secondaryKeys.setdefault((typeName, fieldName), []).append((indexKey, position))
+            yield typeName + " " + " ".join(fields)
+    locators = packFiles('record', recordLines(), renames, newFileNames('record', []))
+
+    primaryPairs = {}
+    for (typeName, key, data), locator in zip(entries, locators):
+        primaryPairs.setdefault(typeName, []).append((key, locator))
+    for typeName in typeNames:
+        typeInformation = typeCatalog.get(typeName)
+        primaryPairs[typeName] = sorted(primaryPairs.get(typeName, []))
+        indexes = [(fileName, typeInformation.primaryKeyType(), primaryPairs[typeName])
+                   for fileName in typeInformation.primaryIndexes]
+        for fieldName in typeInformation.indexedFields:
+            pairs = sorted((indexKey, locators[position]) for indexKey, position in secondaryKeys.get((typeName, fieldName), []))
+            indexes.append((secondaryIndexFileName(typeName, fieldName), 'str', pairs))
+        for fileName, keyType, pairs in indexes:
+            temporaryName = VACUUM_FILE + str(len(renames) + 1) + '.tmp'
+            indexClass(fileName).bulk_load(temporaryName, keyType, pairs).close()
+            renames.append((temporaryName, fileName))
+
+    finalNames = set(fileName for temporaryName, fileName in renames)
+    removals = [fileName for fileName in oldFiles if fileName not in finalNames]
+    sizeAfter = sum(os.path.getsize(temporaryName) for temporaryName, fileName in renames)
+    writeAheadLog.log("swap files", renames, removals)
+    writeAheadLog.onCommit(lambda: swapFiles(renames, removals))
+
+    return str(len(typeNames)) + " types and " + str(len(entries)) + " records packed into " + \
+           str(typeFileNo) + " type files and " + str(len(renames) - typeFileNo - len(indexFiles)) + " record files, " + \
+           str(len(oldFiles)) + " data files before. " + str(sizeBefore) + " bytes before, " + str(sizeAfter) + \
+           " bytes after, " + str(sizeBefore - sizeAfter) + " bytes reclaimed."
+
+def importRecords(typeName, csvFileName):
+    """Loads the rows of a CSV file as records of a type. Rows that do not match the fields of the
+    type, or whose primary key is already taken, are rejected. The rows are sorted by primary key
+    and checked for duplicates against the index in a single merging pass, then written full page
+    after full page into new record files. The indexes of the type are bulk loaded from the
+    merged keys. Like vacuum() the files are moved in place once the command is committed.
+    Returns a report, or None if there is no such type."""
+    typeInformation = typeCatalog.get(typeName)
+    bplustree = indexCache.open(typeName)
+    if typeInformation == None or bplustree == None:
+        return None
+    checkpoint()
+    removeTemporaryFiles()
+
+    fieldNames = [fieldName for fieldName, fieldType in typeInformation.fields]
+    longestSlot = str(databaseGeometry['record'].slotsPerPage) + " "
+    rows = []
+    rejectedNo = 0
+    readRows = open(csvFileName, newline='')
+    for row in csv.reader(readRows):
+        values = [value.strip() for value in row]
+        if not values or values == fieldNames:
+            continue
+        line = typeName + " " + " ".join(values)
+        try:
+            if len(values) != len(fieldNames) or any(not value or len(value.split()) != 1 for value in values):
+                raise ValueError(line)
+            for value, (fieldName, fieldType) in zip(values, typeInformation.fields):
+                if fieldType == 'int':
+                    int(value)
+            if encodeRecord(databaseGeometry['record'], 'record', longestSlot + line) is None or \
+                    not fitsInIndexes(typeInformation, values, values[typeInformation.primaryKeyOrder - 1]):
+                raise ValueError(line)
+        except ValueError:
+            rejectedNo += 1
+            continue
+        rows.append((bplustree.toKey(values[typeInformation.primaryKeyOrder - 1]), line))
+    readRows.close()
+    rows.sort(key=lambda row: row[0])
+
+    #Existing and new keys are merged in order, a new key equal to the one before it is a duplicate.
+    merged = []
+    accepted = []
+    existing = bplustree.items()
+    nextItem = next(existing, None)
+    for key, line in rows:
+        while nextItem is not None and nextItem[0] < key:
+            merged.append(nextItem)
+            nextItem = next(existing, None)
+        if (nextItem is not None and nextItem[0] == key) or (accepted and accepted[-1][1] == key):
+            rejectedNo += 1
+            continue
+        accepted.append((len(merged), key, line))
+        merged.append(None)
+    while nextItem is not None:
+        merged.append(nextItem)
+        nextItem = next(existing, None)
+
+    if not accepted:
+        return "0 records imported into " + typeName + ", " + str(rejectedNo) + " rows rejected."
+
+    renames = []
+    locators = packFiles('record', (line for position, key, line in accepted), renames,
+                         newFileNames('record', records_list))
+    recordFileNo = len(renames)
+    for (position, key, line), locator in zip(accepted, locators):
+        merged[position] = (key, locator)
+
+    indexes = [(fileName, typeInformation.primaryKeyType(), merged) for fileName in typeInformation.primaryIndexes]
+    for fieldName in typeInformation.indexedFields:
+        pairs = list(indexCache.openFile(secondaryIndexFileName(typeName, fieldName)).items())
+        for (position, key, line), locator in zip(accepted, locators):
+            indexKey = secondaryKey(typeInformation, fieldName, line.split()[1:], key)
+            if indexKey is not None:
+                pairs.append((indexKey, locator))
+        indexes.append((secondaryIndexFileName(typeName, fieldName), 'str', sorted(pairs)))
+    for fileName, keyType, pairs in indexes:
+        temporaryName = VACUUM_FILE + str(len(renames) + 1) + '.tmp'
+        indexClass(fileName).bulk_load(temporaryName, keyType, pairs).close()
+        renames.append((temporaryName, fileName))
+
+    writeAheadLog.log("swap files", renames, [])
+    writeAheadLog.onCommit(lambda: swapFiles(renames, []))
+    return str(len(accepted)) + " records imported into " + typeName + " in " + str(recordFileNo) + \
+           " new record files, " + str(rejectedNo) + " rows rejected."
+
+def swapFiles(renames, removals):
+    """Moves the files written by vacuum() in place of the old ones and reloads the database."""
+    global freeSpaceMap, typeCatalog
+    indexCache.close()
+    for file in types_list + records_list:
+        bufferPool.dropFile(file)
+    fileHandles.closeAll()
+    for temporaryName, fileName in renames:
+        if os.path.exists(temporaryName):
+            os.replace(temporaryName, fileName)
+    for fileName in removals:
+        if os.path.exists(fileName):
+            os.remove(fileName)
+
+    types_list[:], records_list[:] = listDataFiles()
+    freeSpaceMap = FreeSpaceMap.load(FREE_SPACE_FILE, types_list + records_list)
+    typeCatalog = TypeCatalog.load(types_list)
+
+QUERY_OPERATIONS = (3, 7, 8, 9)
+PARALLEL_MIN_RUN = 32
+#The forked workers of runQueries(), kept for the following runs until a command commits changes.
+queryPool = None
+queryPoolCommits = 0
+
+def runQuery(line):
+    """Yields the output lines of a read-only command, a command that yields nothing failed."""
+    tokens = line.split()
+    type = whichOperation(tokens)
+    typeName = tokens[2] if len(tokens) > 2 else None
+
+    #A command missing its type name, or the key of a search, yields nothing.
+    if type != 3 and (typeName == None or (type == 7 and len(tokens) < 4)):
+        return
+
+    if type == 3:
+        for typeName in typeCatalog.names():
+            yield typeName
+
+    elif type == 7:
+        bplustree = indexCache.open(typeName)
+        data = bplustree.retrieve(tokens[3]) if bplustree != None else None
+        if data != None:
+            yield " ".join(readRecord(data))
+
+    elif type == 8:
+        bplustree = indexCache.open(typeName)
+        if typeCatalog.get(typeName) != None and bplustree != None:
+            #Records come out of the index in primary key order, no sorting is needed.
+            for searchedRecord in streamRecords(data for key, data in bplustree.items()):
+                yield " ".join(searchedRecord)
+
+    elif type == 9:
+        typeInformation = typeCatalog.get(typeName)
+        bplustree = indexCache.open(typeName)
+        if typeInformation != None and bplustree != None:
+            for result in matchingRecords(typeInformation, bplustree, " ".join(tokens[3:])):
+                yield " ".join(result)
+
+def startQueryWorker():
+    fileHandles.detach()
+
+def queryOutput(line):
+    """Runs a read-only command on a worker, returns its output and the I/O it did."""
+    before = ioCounters.snapshot()
+    return list(runQuery(line)), ioCounters.since(before)
+
+def openQueryPool():
+    """Returns the worker processes for a run of read-only commands. The workers are forked again
+    only if a command committed changes since the last fork: the modified pages and index nodes
+    are written back first, without syncing them or emptying the log, and each new worker reads
+    them through files of its own, so the workers share nothing that changes."""
+    global queryPool, queryPoolCommits
+    if queryPool != None and queryPoolCommits == writeAheadLog.commitCount:
+        return queryPool
+    closeQueryPool()
+    indexCache.flush()
+    bufferPool.flush()
+    fileHandles.flush()
+    queryPool = multiprocessing.get_context('fork').Pool(args.workers, startQueryWorker)
+    queryPoolCommits = writeAheadLog.commitCount
+    return queryPool
+
+def closeQueryPool():
+    global queryPool
+    if queryPool != None:
+        queryPool.close()
+        queryPool.join()
+        queryPool = None
+
+def runQueries(lines):
+    """Runs consecutive read-only commands and writes their output and log lines in input order.
+    Runs of at least PARALLEL_MIN_RUN commands are spread over args.workers forked processes,
+    see openQueryPool()."""
+    if args.workers > 1 and len(lines) >= PARALLEL_MIN_RUN and 'fork' in multiprocessing.get_all_start_methods():
+        outputs = openQueryPool().imap(queryOutput, lines, max(1, len(lines) // (args.workers * 4)))
+    else:
+        outputs = ((runQuery(line), None) for line in lines)
+    for line in lines:
+        commandStats.begin(line)
+        output, workerCounts = next(outputs)
+        if workerCounts != None:
+            ioCounters.add(workerCounts)
+        resultNo = 0
+        for result in output:
+            outFile.write(result)
+            resultNo += 1
+        log(line, 'success' if resultNo else 'failure')
+
+def runCommand(line):
+    """Runs a command that is not read-only and logs whether it succeeded. Returns True if it did."""
+    commandStats.begin(line)
+    tokens = line.split()
+    type = whichOperation(tokens) 
+
+    if type == None:
+        log(line, 'failure')
+        return False
+
+    if type ==1 :
+        typeName = tokens[2]
+
+        if typeCatalog.get(typeName) != None:
+            log(line, 'failure')
+            return False
+
+        fieldNo = int(tokens[3])
+        primaryKeyOrder = tokens[4]
+        primaryKey = tokens[4 + 2*int(tokens[4])-1]
+        primaryKeyType = tokens[4 + 2*int(tokens[4])]
+
+        #"hash" after the fields gives the type a hash index on its primary key instead of the B+ tree, "hash btree" both.
+        indexKinds = set(tokens[5 + 2*fieldNo:]) or {'btree'}
+        if not indexKinds <= {'btree', 'hash'}:
+            log(line, 'failure')
+            return False
+
+        #Note in typeInf primary key is the first field.
+        typeInf = typeName + " " + primaryKeyOrder + " " +primaryKey + " " + primaryKeyType
+        for i in range(fieldNo):
+            if tokens[5+2*i] != primaryKey:
+                typeInf = typeInf +" " + tokens[5+2*i] + " " +tokens[6+2*i]
+        
+
+        #Find a place to insert new type info
+        availableTypeFile, pageNo, firstEmptySpot = findTypeFile()
+        lineToAdd = str(firstEmptySpot) +" " + typeInf
+        if not fitsInSlot(availableTypeFile, lineToAdd):
+            log(line, 'failure')
+            return False
+
+        if 'btree' in indexKinds and not os.path.exists(indexFileName(typeName)):
+            indexCache.create(indexFileName(typeName), primaryKeyType)
+        if 'hash' in indexKinds and not os.path.exists(hashIndexFileName(typeName)):
+            indexCache.create(hashIndexFileName(typeName), primaryKeyType)
+
+        freeSpaceMap.take(availableTypeFile, pageNo, firstEmptySpot)
+        writeSlot(availableTypeFile, pageNo, firstEmptySpot, lineToAdd)
+        typeCatalog.add(availableTypeFile, pageNo, lineToAdd)
+
+    elif type == 2:
+        typeToDelete = tokens[2]
+
+        results = typeCatalog.get(typeToDelete)
+
+        if  results == None:
+            log(line, 'failure')
+            return False
+
+        else: 
+            #the type file is removed as well if this was its last type
+            deleteRecord(results.file+":"+str(results.pageNo)+":"+str(results.slot))
+            typeCatalog.remove(typeToDelete)
+                          
+        #ALL RECORDS OF THIS TYPE SHOULD BE DELETED
+        bplustree = indexCache.open(typeToDelete)
+
+        if bplustree == None:
+            log(line, 'failure')
+            return False
+
+        deleteRecords(data for key, data in bplustree.items())
+        for fileName in results.primaryIndexes:
+            indexCache.drop(fileName)
+        for fieldName in results.indexedFields:
+            indexCache.drop(secondaryIndexFileName(typeToDelete, fieldName))
+                
+    elif type == 4:
+        typeName = tokens[2]
+
+        typeInformation = typeCatalog.get(typeName)
+
+        if typeInformation == None:
+            log(line, 'failure')
+            return False
+
+        primaryKey = tokens[2+typeInformation.primaryKeyOrder]
+
+        bplustree = indexCache.open(typeName)
+
+        if bplustree == None:
+            log(line, 'failure')
+            return False
+
+        try:
+            bplustree.toKey(primaryKey)
+        except ValueError:
+            log(line, 'failure')
+            return False
+
+        if bplustree.retrieve(primaryKey) != None:
+            log(line, 'failure')
+            return False
+
+        recordInfo = typeName
+        for token in tokens[3:]:
+            recordInfo = recordInfo + " " + token
+        
+        #Find a place to insert new record info
+        availableRecordFile, pageNo, firstEmptySpot = findRecordFile()
+        lineToAdd = str(firstEmptySpot) +" " + recordInfo
+        if not fitsInSlot(availableRecordFile, lineToAdd) or not fitsInIndexes(typeInformation, tokens[3:], primaryKey):
+            log(line, 'failure')
+            return False
+        freeSpaceMap.take(availableRecordFile, pageNo, firstEmptySpot)
+        writeSlot(availableRecordFile, pageNo, firstEmptySpot, lineToAdd)
+
+        locator = availableRecordFile+':'+str(pageNo)+":"+str(firstEmptySpot)
+        bplustree.insert(primaryKey, locator)
+        updateSecondaryIndexes(typeInformation, bplustree.toKey(primaryKey), None, tokens[3:], locator)
+
+    elif type == 5:
+
+        typeName = tokens[2]
+        bplustree = indexCache.open(typeName)
+        primaryKey = tokens[3]
+
+        if bplustree == None:
+            log(line, 'failure')
+            return False
+
+        data = bplustree.delete(primaryKey)
+
+        if data == None:
+            log(line, 'failure')
+            return False
+
+        typeInformation = typeCatalog.get(typeName)
+        if typeInformation.indexedFields:
+            updateSecondaryIndexes(typeInformation, bplustree.toKey(primaryKey), readRecord(data), None, data)
+        deleteRecord(data)
+    
+    elif type == 6:
+        typeName = tokens[2]
+        bplustree = indexCache.open(typeName)
+        primaryKey = tokens[3]
+
+        if bplustree == None:
+            log(line, 'failure')
+            return False
+
+        data = bplustree.retrieve(primaryKey)
+
+        if data == None:
+            log(line, 'failure')
+            return False
+
+        file,pageNo,record = data.split(":")[0],data.split(":")[1],data.split(":")[2]
+
+        #Bu primary key hep birinci mi yoksa type a bağlı mı öğren.
+
+        updatedInfo = typeName
+        for token in tokens[4:]:
+            updatedInfo = updatedInfo + " " + token
+
+        lineToAdd = record + " " +updatedInfo
+        typeInformation = typeCatalog.get(typeName)
+        if not fitsInSlot(file, lineToAdd) or not fitsInIndexes(typeInformation, tokens[4:], primaryKey):
+            log(line, 'failure')
+            return False
+        oldFields = readRecord(data) if typeInformation.indexedFields else None
+        writeSlot(file, int(pageNo), int(record), lineToAdd)
+        if oldFields is not None:
+            updateSecondaryIndexes(typeInformation, bplustree.toKey(primaryKey), oldFields, tokens[4:], data)
+       
+    elif type == 10:
+        typeName = tokens[2]
+        fieldName = tokens[3]
+
+        typeInformation = typeCatalog.get(typeName)
+
+        if typeInformation == None or indexCache.open(typeName) == None:
+            log(line, 'failure')
+            return False
+
+        position = typeInformation.fieldPosition(fieldName)
+
+        #The primary key is already indexed.
+        if position == None or position == typeInformation.primaryKeyOrder - 1 or fieldName in typeInformation.indexedFields:
+            log(line, 'failure')
+            return False
+
+        if not buildSecondaryIndex(typeInformation, fieldName):
+            log(line, 'failure')
+            return False
+        writeAheadLog.log("build index", typeName, fieldName)
+        typeInformation.indexedFields.append(fieldName)
+
+    log(line, 'success')
+    return True
+
+class CommandLock(object):
+    """Lets any number of read-only commands run at once on the server, or one write command.
+    A read only gives way to other connections while its output is sent, but no write may run
+    until it is done. Once a write is waiting no new read is let in, so writes do not starve.
+    """
+    def __init__(self):
+        self.readers = 0
+        self.writing = False
+        self.waitingWriters = 0
+        self.changed = asyncio.Condition()
+
+    async def acquireRead(self):
+        async with self.changed:
+            await self.changed.wait_for(lambda: not self.writing and not self.waitingWriters)
+            self.readers += 1
+
+    async def releaseRead(self):
+        async with self.changed:
+            self.readers -= 1
+            self.changed.notify_all()
+
+    async def acquireWrite(self):
+        async with self.changed:
+            self.waitingWriters += 1
+            await self.changed.wait_for(lambda: not self.writing and not self.readers)
+            self.waitingWriters -= 1
+            self.writing = True
+
+    async def releaseWrite(self):
+        async with self.changed:
+            self.writing = False
+            self.changed.notify_all()
+
+class Server(object):
+    """Runs the commands sent by clients over a Unix socket against the database opened at
+    startup, so the catalog, indexes and pages stay in memory between commands. Every command
+    is answered with its output lines, an empty line and "success" or "failure".
+    Attributes:
+        checkpointCommands (int): The number of write commands after which the write-ahead log
+            is checkpointed, so that it does not grow for as long as the server runs.
+    """
+    def __init__(self, socketPath, checkpointCommands):
+        self.socketPath = socketPath
+        self.checkpointCommands = max(1, checkpointCommands)
+        self.writesSinceCheckpoint = 0
+        self.connections = set()
+
+    def run(self):
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        self.lock = CommandLock()
+        self.stopped = asyncio.get_running_loop().create_future()
+        for signalNo in (signal.SIGINT, signal.SIGTERM):
+            asyncio.get_running_loop().add_signal_handler(signalNo, self.stop)
+        if os.path.exists(self.socketPath):
+            os.remove(self.socketPath)
+        server = await asyncio.start_unix_server(self.serveConnection, self.socketPath)
+        try:
+            #A write command that raised leaves the database as a crash would, it is not closed.
+            await self.stopped
+        finally:
+            server.close()
+            for writer in self.connections:
+                writer.close()
+            os.remove(self.socketPath)
+
+    def stop(self, error=None):
+        if not self.stopped.done():
+            if error != None:
+                self.stopped.set_exception(error)
+            else:
+                self.stopped.set_result(None)
+
+    async def serveConnection(self, reader, writer):
+        self.connections.add(writer)
+        try:
+            while not self.stopped.done():
+                request = await reader.readline()
+                if not request:
+                    break
+                line = request.decode('utf-8').strip()
+                if not line:
+                    continue
+                try:
+                    type = whichOperation(line.split())
+                except IndexError:
+                    commandStats.begin(line)
+                    log(line, 'failure')
+                    writer.write(b"\nfailure\n")
+                    continue
+
+                if type in QUERY_OPERATIONS:
+                    succession = await self.query(line, writer)
+                else:
+                    succession = await self.command(line)
+                writer.write(("\n" + succession + "\n").encode('utf-8'))
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            #A client went away, or the server is stopping while the client is connected.
+            pass
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+
+    async def query(self, line, writer):
+        """Sends the output of a read-only command, letting other connections run every
+        RECORD_BATCH lines. A read-only command that raises changed nothing and only fails."""
+        await self.lock.acquireRead()
+        try:
+            measuring = commandStats.begin(line)
+            resultNo = 0
+            try:
+                for result in runQuery(line):
+                    writer.write((result + "\n").encode('utf-8'))
+                    resultNo += 1
+                    if resultNo % RECORD_BATCH == 0:
+                        await writer.drain()
+            except (IndexError, ValueError):
+                resultNo = 0
+            succession = 'success' if resultNo else 'failure'
+            #Other reads may have run meanwhile, their I/O is counted for this command as well.
+            commandStats.current = measuring
+            log(line, succession)
+            return succession
+        finally:
+            await self.lock.releaseRead()
+
+    async def command(self, line):
+        """Runs a write command. A command missing some of its tokens raises before it logs any
+        change and only fails, any other error stops the server."""
+        await self.lock.acquireWrite()
+        try:
+            try:
+                succeeded = runCommand(line)
+            except (IndexError, ValueError):
+                if writeAheadLog.changes:
+                    raise
+                log(line, 'failure')
+                return 'failure'
+            self.writesSinceCheckpoint += 1
+            if self.writesSinceCheckpoint >= self.checkpointCommands:
+                checkpoint()
+                self.writesSinceCheckpoint = 0
+            return 'success' if succeeded else 'failure'
+        except Exception as error:
+            self.stop(error)
+            raise
+        finally:
+            await self.lock.releaseWrite()
+
+#Records of the binary format are decoded with the catalog, so it is loaded before the log is redone
+#and kept up to date by the redone changes to the type files.
+typeCatalog = TypeCatalog.load(types_list)
+recoverDatabase()
+
+if mode == 'vacuum':
+    commandStats.begin('vacuum')
+    outFile.write(vacuum(args.cluster))
+    log('vacuum', 'success')
+
+elif mode == 'import':
+    commandStats.begin('import ' + args.typeName + ' ' + args.csvFile)
+    report = importRecords(args.typeName, args.csvFile)
+    if report == None:
+        log('import ' + args.typeName + ' ' + args.csvFile, 'failure')
+    else:
+        outFile.write(report)
+        log('import ' + args.typeName + ' ' + args.csvFile, 'success')
+
+elif mode == 'serve':
+    Server(args.socketPath, args.checkpoint_commands).run()
+
+#Read-only commands are collected and run together before the next command that writes. The log
+#is checkpointed every args.checkpoint_commands write commands, so it does not grow with the input.
+pendingQueries = []
+writesSinceCheckpoint = 0
+for line in inputFile:
+    line = line.strip()
+    if not line:
+        continue
+
+    if whichOperation(line.split()) in QUERY_OPERATIONS:
+        pendingQueries.append(line)
+        continue
+    runQueries(pendingQueries)
+    pendingQueries = []
+    runCommand(line)
+    writesSinceCheckpoint += 1
+    if writesSinceCheckpoint >= args.checkpoint_commands:
+        checkpoint()
+        writesSinceCheckpoint = 0
+
+runQueries(pendingQueries)
+closeQueryPool()
+checkpoint()
+indexCache.close()
+fileHandles.closeAll()
+writeAheadLog.close()
+freeSpaceMap.save(FREE_SPACE_FILE)
+outFile.close()
+if statsFile != None:
+    statsFile.close()
+    sys.stderr.write(commandStats.summary() + "\n")
+if profiler != None:
+    profiler.dump_stats(args.profile_file)
 logFile.close()
\ No newline at end of file